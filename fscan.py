@@ -3,14 +3,33 @@ import os
 import sys
 import sqlite3
 import argparse
+import functools
 import hashlib
+import itertools
 import time
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import socket
 import uuid
 import subprocess
+import shutil
 import json
 import signal
+import re
+import stat
+import queue as queue_mod
+import threading
+
+# optional faster content hashes for --hash-algo
+try:
+  import blake3
+except ImportError:
+  blake3 = None
+
+try:
+  import xxhash
+except ImportError:
+  xxhash = None
 
 try:
   from lib.LICENSE_fscan import LICENSE_TEXT
@@ -39,7 +58,34 @@ DBFILE defaults to ~/.filesage/fscan.db
 """
 
 
-BATCH_SIZE = 1000
+BATCH_SIZE = 10000
+
+# row batches that may wait for the DB writer thread before scan() blocks
+WRITE_QUEUE_DEPTH = 4
+
+# threads used to read directories ahead of the scan loop; scandir/stat
+# release the GIL, so several directories can be listed at once
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# threads hashing file contents for -H; file_digest drops the GIL while hashing
+HASH_WORKERS = os.cpu_count() or 1
+# hashes queued or running on the pool before the walk waits for one to finish;
+# keeps Ctrl-C (and the resume checkpoint behind them) from waiting on a
+# backlog of thousands of files when the walk outruns the disk
+HASH_INFLIGHT_MAX = HASH_WORKERS * 2
+# content hash algorithms for -H. sha256 digests are stored as plain hex (as
+# always); the others as "<algo>:<hex>" so they never equal a sha256 entry
+HASH_ALGOS = ("sha256", "blake3", "xxh3")
+# files up to this size are hashed inline; handing them to the pool costs more
+HASH_INLINE_MAX = 64 * 1024
+# hash failures written to stderr per scan; past that only the total is shown
+HASH_ERROR_LOG_MAX = 20
+# digest -> content_hashes id entries the DB writer keeps before starting over
+HASH_ID_CACHE_MAX = 500000
+
+# seconds between resume-state checkpoints written during a scan, so a run
+# killed without a graceful stop can still be resumed
+CHECKPOINT_INTERVAL = 30
 
 # semantic version for the fscan tool
 VERSION = "0.52"
@@ -53,6 +99,13 @@ SKIP_DIRS = {os.path.normpath(os.path.abspath(p)) for p in ("/swap.img", "/tmp",
 # relative to the scan root starts with that string.
 RELATIVE_SKIP_DIRS = {".cache/mozilla/firefox", ".cache/google-chrome", ".cache/opera", "flatpak/runtime" }
 
+# external tools used to probe drive serials, resolved once at import so a
+# missing tool costs nothing per device instead of a failed fork/exec.
+# hdparm runs through sudo, which searches the sbin directories itself.
+HAVE_LSBLK = shutil.which("lsblk") is not None
+HAVE_BLKID = shutil.which("blkid") is not None
+HAVE_SUDO_HDPARM = shutil.which("sudo") is not None and shutil.which("hdparm", path=os.pathsep.join((os.environ.get("PATH", ""), "/usr/sbin", "/sbin"))) is not None
+
 # Global flag set by signal handler to request scan stop
 STOP_REQUESTED = False
 
@@ -66,27 +119,39 @@ def _signal_handler(signum, frame):
   print("Interrupt received, will stop after current file and exit gracefully...", file=sys.stderr)
   STOP_REQUESTED = True
 
+def skip_prefixes(allow_mnt, allow_media):
+  """Return the SKIP_DIRS that apply as a tuple of prefixes ending in os.sep.
+
+  Selection follows the allow_mnt/allow_media rule is_skipped_path has
+  always used; the tuple is meant for one str.startswith() on path + os.sep.
+  """
+  return tuple(sorted(
+    s.rstrip(os.sep) + os.sep for s in SKIP_DIRS
+    if not ((not allow_mnt or s == "/mnt") and (not allow_media or s == "/media"))
+  ))
+
+
 def is_skipped_path(path,allow_mnt,allow_media):
   """Return True if path is equal to or under any configured skip directory."""
   path = os.path.normpath(os.path.abspath(path))
-  for s in SKIP_DIRS:
-    if (not allow_mnt or s=="/mnt") and (not allow_media or s=="/media"):
-      continue
-    try:
-      if os.path.commonpath([path, s]) == s:
-        return True
-    except ValueError:
-      # different mount points or other odd cases; treat as not under s
-      continue
-  return False
+  return (path + os.sep).startswith(skip_prefixes(allow_mnt, allow_media))
+
+
+# RELATIVE_SKIP_DIRS compiled into one alternation: a path matches when
+# "/<pattern>/" occurs anywhere in "/<path relative to root>/"
+_REL_SKIP_PATTERNS = sorted({p.strip('/').replace(os.path.sep, '/') for p in RELATIVE_SKIP_DIRS if p and p.strip('/')})
+_REL_SKIP_RE = re.compile('/(?:' + '|'.join(re.escape(p) for p in _REL_SKIP_PATTERNS) + ')/') if _REL_SKIP_PATTERNS else None
 
 
 def is_rel_skipped(path, root):
   """Return True if the path (absolute) is under a relative-skip pattern.
 
   We compute the path relative to `root` and check whether it equals or is
-  underneath any entry in RELATIVE_SKIP_DIRS.
+  underneath any entry in RELATIVE_SKIP_DIRS. Matching is by whole path
+  components, so "cache/mozilla" doesn't match "unrelatedcache/mozillax".
   """
+  if _REL_SKIP_RE is None:
+    return False
   try:
     rel = os.path.relpath(path, root)
   except Exception:
@@ -96,26 +161,49 @@ def is_rel_skipped(path, root):
   rel_norm = rel.replace(os.path.sep, '/')
   if rel_norm == '.' or rel_norm == './':
     rel_norm = ''
+  return _REL_SKIP_RE.search('/' + rel_norm.strip('/') + '/') is not None
 
-  for pat in RELATIVE_SKIP_DIRS:
-    if not pat:
-      continue
-    pat_norm = pat.strip('/').replace(os.path.sep, '/')
-    if pat_norm == '':
-      continue
-    # match when the normalized pattern appears anywhere in the relative
-    # path as a complete component sequence. Use surrounding slashes so a
-    # pattern like "cache/mozilla" doesn't match "unrelatedcache/mozillax".
-    rel_slash = '/' + rel_norm.strip('/') + '/'
-    pat_slash = '/' + pat_norm.strip('/') + '/'
-    if pat_slash in rel_slash:
-      return True
-  return False
+
+def skip_pattern(root, allow_mnt, allow_media):
+  """Compile every skip rule for a scan of `root` into one regex.
+
+  Matched against path + os.sep, it gives the same answer as the
+  skip_prefixes() startswith test or is_rel_skipped_fast() for any path
+  under root, in a single call.
+  """
+  alts = [re.escape(p) for p in skip_prefixes(allow_mnt, allow_media)]
+  if _REL_SKIP_PATTERNS:
+    alts.append(
+      re.escape(root.rstrip(os.sep) + os.sep) + '(?:.*/)?(?:'
+      + '|'.join(re.escape(p) for p in _REL_SKIP_PATTERNS) + ')/'
+    )
+  if not alts:
+    # nothing to skip: a pattern that never matches
+    return re.compile('(?!)')
+  return re.compile('(?s)' + '|'.join(alts))
+
+
+def is_rel_skipped_fast(path, root_prefix_len):
+  """is_rel_skipped() for paths scan() builds under its root.
+
+  Those paths are already absolute and normalized and start with the root
+  (plus a trailing separator), so the relative part is just a slice.
+  """
+  if _REL_SKIP_RE is None:
+    return False
+  return _REL_SKIP_RE.search('/' + path[root_prefix_len:] + '/') is not None
 
 
 SCHEMA = """
 PRAGMA journal_mode = WAL;
 PRAGMA synchronous = NORMAL;
+-- bulk-load friendly connection settings: ~200 MB page cache, temp tables and
+-- sort spills in memory, and memory-mapped reads of the DB file
+PRAGMA cache_size = -200000;
+PRAGMA temp_store = MEMORY;
+PRAGMA mmap_size = 1073741824;
+-- checkpoint the WAL every ~400 MB instead of every ~4 MB during bulk inserts
+PRAGMA wal_autocheckpoint = 100000;
 
 CREATE TABLE IF NOT EXISTS files (
   dev_major INTEGER NOT NULL,
@@ -142,12 +230,6 @@ CREATE TABLE IF NOT EXISTS files (
   PRIMARY KEY (dirpath, name, scan_run_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_dirpath_name ON files(dirpath, name);
-
-CREATE INDEX IF NOT EXISTS idx_ctime ON files(ctime);
-
-CREATE INDEX IF NOT EXISTS idx_suffix ON files(suffix);
-
 CREATE TABLE IF NOT EXISTS content_hashes (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   content_hash TEXT UNIQUE
@@ -207,6 +289,20 @@ CREATE TABLE IF NOT EXISTS scan_run_state (
  
 """
 
+# secondary indexes on files. They are created when a scan finishes rather
+# than with the tables, so a first bulk load doesn't maintain them per row;
+# IF NOT EXISTS makes this a no-op once they exist.
+# lookup of an unchanged file in earlier runs, to reuse its content hash
+INDEX_FILES_IDENT = "CREATE INDEX IF NOT EXISTS idx_files_ident ON files(dev_major, dev_minor, ino, size, mtime);"
+
+SCHEMA_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_dirpath_name ON files(dirpath, name);
+
+CREATE INDEX IF NOT EXISTS idx_ctime ON files(ctime);
+
+CREATE INDEX IF NOT EXISTS idx_suffix ON files(suffix);
+""" + INDEX_FILES_IDENT + "\n"
+
 INSERT_UPSERT = """
 INSERT INTO files
 (dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime,
@@ -233,6 +329,18 @@ ON CONFLICT(dirpath, name, scan_run_id) DO UPDATE SET
   drive_serial_id = excluded.drive_serial_id;
 """
 
+# position of content_hash_id in an INSERT_UPSERT row
+HASH_ID_COL = 18
+
+# INSERT_UPSERT with many rows per statement, so a batch is bound and
+# stepped in a few large statements. 21 values per row must stay under
+# SQLite's host-parameter limit (32766, or 999 before 3.32)
+INSERT_ROWS_PER_STMT = 1500 if sqlite3.sqlite_version_info >= (3, 32, 0) else 45
+_ROW_PARAMS = "(" + ", ".join("?" * 21) + ")"
+INSERT_UPSERT_MULTI = INSERT_UPSERT.replace(
+  "VALUES " + _ROW_PARAMS, "VALUES " + ",\n".join([_ROW_PARAMS] * INSERT_ROWS_PER_STMT), 1
+)
+
 
 def init_db(args):
 
@@ -255,13 +363,18 @@ def init_db(args):
       pass
 
   try:
-    conn = sqlite3.connect(db_path, timeout=30)
+    # scan() hands batch inserts to a writer thread; access is serialized
+    # with a lock there
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
   except Exception as e:
     print(f"Failed to open database {db_path}: {e}", file=sys.stderr)
     sys.exit(1)
 
   conn.execute("PRAGMA foreign_keys = ON;")
   conn.executescript(SCHEMA)
+  if getattr(args, 'unsafe_sync', False):
+    # scan data can be regenerated by rescanning; trade durability for speed
+    conn.execute("PRAGMA synchronous = OFF;")
   # Perform lightweight migrations for older DBs: add any newly-introduced columns
   try:
     cur = conn.cursor()
@@ -374,8 +487,10 @@ def make_parser():
   parser.add_argument('-?', action='help', help='show this help message and exit')
   parser.add_argument("--database", dest='db', help="SQLite DB file (default: ~/.filesage/fscan.db)", default="~/.filesage/fscan.db")
   parser.add_argument("-s", "--silent", action="store_true", help="suppress progress and start/finish messages")
-  parser.add_argument("-H", "--hash", dest='compute_hash', action="store_true", help="compute and store sha256 hash of regular file contents")
+  parser.add_argument("-H", "--hash", dest='compute_hash', action="store_true", help="compute and store a content hash of regular files (sha256 unless --hash-algo)")
+  parser.add_argument("--hash-algo", dest='hash_algo', choices=HASH_ALGOS, default="sha256", help="content hash used with -H: sha256 (default), or the faster blake3/xxh3 (need the blake3/xxhash packages; stored as '<algo>:<hex>')")
   parser.add_argument("-c", "--comment", dest='comment', help="comment to store with this scan run", default=None)
+  parser.add_argument("--unsafe-sync", dest='unsafe_sync', action="store_true", help="skip fsyncs while writing the database (faster; a crash or power loss mid-scan may corrupt it)")
   parser.add_argument("--name", dest='name', help="friendly name for this scan run", default=None)
   parser.add_argument("--version", dest='version', action='store_true', help="Show program version and exit")
   parser.add_argument("--resume", dest='resume', type=int, help="resume an unfinished scan by scan_run id", default=None)
@@ -527,6 +642,7 @@ def get_hardware_id():
     return None
 
 
+@functools.lru_cache(maxsize=256)
 def get_block_device_name(major, minor):
   """Return block device name (e.g., 'sda') for given major:minor via /sys/dev/block lookup."""
   try:
@@ -592,67 +708,89 @@ def extract_value(key1,key2,out):
   return ''
 
 
+@functools.lru_cache(maxsize=1)
+def _lsblk_serials():
+  """Return {disk name: serial} from a single `lsblk -J` call (empty dict on failure)."""
+  try:
+    out = subprocess.check_output(["lsblk", "-J", "-d", "-o", "NAME,SERIAL"], stderr=subprocess.DEVNULL, text=True, timeout=3)
+    return {d.get('name'): (d.get('serial') or '').strip() for d in json.loads(out).get('blockdevices', [])}
+  except Exception:
+    return {}
+
+
+@functools.lru_cache(maxsize=1)
+def _blkid_output():
+  """Return the full `blkid` listing, run once per process."""
+  try:
+    return subprocess.check_output(["blkid"], stderr=subprocess.DEVNULL, text=True, timeout=3)
+  except Exception:
+    return ''
+
+
 def probe_drive_serial(conn, block_dev):
   """Probe drive serial for block device name using hdparm, sysfs, then lsblk.
 
   Prefers `hdparm -i /dev/<dev>` (via sudo -n to avoid interactive password prompt).
   Falls back to sysfs entries and then to `lsblk` if needed. Returns serial string or None.
+  Only the usb lookup touches the database; the probing itself is cached per device.
   """
   if not block_dev:
     return None
+  return _probe_drive_serial(block_dev, bool(HAVE_LSBLK and is_usb(conn, block_dev)))
+
 
-  if is_usb(conn, block_dev):
+@functools.lru_cache(maxsize=256)
+def _probe_drive_serial(block_dev, usb):
+  if usb:
 
     # preferred lsblk SERIAL
+    s = _lsblk_serials().get(block_dev)
+    if s:
+      return s
+
+  if HAVE_BLKID:
+    # try blkid UUID
     try:
-      out = subprocess.check_output(["lsblk", "-no", "SERIAL", f"/dev/{block_dev}"], stderr=subprocess.DEVNULL, text=True, timeout=3)
-      s = out.strip()
-      if s:
-        return s
+      blkid_out = _blkid_output()
+      if blkid_out:
+        uuid = extract_value(block_dev,"UUID",blkid_out)
+        return uuid.split('"')[1]
+    except Exception:
+      pass
+    # fallback to blkid ID_SERIAL if available
+    try:
+      idser = subprocess.check_output(["blkid", "-s", "ID_SERIAL", "-o", "value", f"/dev/{block_dev}"], stderr=subprocess.DEVNULL, text=True, timeout=3).strip()
+      if idser:
+        return idser
     except Exception:
       pass
-
-  # try blkid UUID
-  try:
-    blkid_out = subprocess.check_output(["blkid"], stderr=subprocess.DEVNULL, text=True, timeout=3)
-    if blkid_out:
-      uuid = extract_value(block_dev,"UUID",blkid_out)
-      return uuid.split('"')[1]
-  except Exception:
-    pass
-  # fallback to blkid ID_SERIAL if available
-  try:
-    idser = subprocess.check_output(["blkid", "-s", "ID_SERIAL", "-o", "value", f"/dev/{block_dev}"], stderr=subprocess.DEVNULL, text=True, timeout=3).strip()
-    if idser:
-      return idser
-  except Exception:
-    pass
 
 
-  # prefer hdparm (may require sudo); run non-interactively
-  try:
-    out = subprocess.check_output(["sudo", "-n", "hdparm", "-i", f"/dev/{block_dev}"], stderr=subprocess.STDOUT, text=True, timeout=5)
-    for line in out.splitlines():
-      if 'Model=' in line and 'SerialNo=' in line:
-        parts = [p.strip() for p in line.split(',')]
-        for p in parts:
-          if p.startswith('SerialNo='):
-            serial = p.split('=', 1)[1].strip()
-            if serial:
-              return serial
-    for line in out.splitlines():
-      if 'SerialNo=' in line:
-        idx = line.find('SerialNo=')
-        serial = line[idx + len('SerialNo='):].split()[0].strip().strip(',')
-        if serial:
-          return serial
-  except subprocess.CalledProcessError:
-    # hdparm failed (non-zero exit), continue to sysfs/lsblk
-    pass
-  except subprocess.TimeoutExpired:
-    pass
-  except Exception:
-    pass
+  if HAVE_SUDO_HDPARM:
+    # prefer hdparm (may require sudo); run non-interactively
+    try:
+      out = subprocess.check_output(["sudo", "-n", "hdparm", "-i", f"/dev/{block_dev}"], stderr=subprocess.STDOUT, text=True, timeout=5)
+      for line in out.splitlines():
+        if 'Model=' in line and 'SerialNo=' in line:
+          parts = [p.strip() for p in line.split(',')]
+          for p in parts:
+            if p.startswith('SerialNo='):
+              serial = p.split('=', 1)[1].strip()
+              if serial:
+                return serial
+      for line in out.splitlines():
+        if 'SerialNo=' in line:
+          idx = line.find('SerialNo=')
+          serial = line[idx + len('SerialNo='):].split()[0].strip().strip(',')
+          if serial:
+            return serial
+    except subprocess.CalledProcessError:
+      # hdparm failed (non-zero exit), continue to sysfs/lsblk
+      pass
+    except subprocess.TimeoutExpired:
+      pass
+    except Exception:
+      pass
 
   # try sysfs paths
   try:
@@ -704,10 +842,18 @@ def get_drive_serial_for_dev(conn, major, minor, cache):
     if r:
       cache[key] = r[0]
       return r[0]
-    cur.execute("INSERT OR IGNORE INTO drive_serials(serial) VALUES (?)", (serial,))
-    conn.commit()
-    cur.execute("SELECT id FROM drive_serials WHERE serial = ?", (serial,))
-    r = cur.fetchone()
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+      # new serial: take the id straight from the insert
+      cur.execute("INSERT OR IGNORE INTO drive_serials(serial) VALUES (?) RETURNING id", (serial,))
+      r = cur.fetchone()
+      conn.commit()
+    else:
+      cur.execute("INSERT OR IGNORE INTO drive_serials(serial) VALUES (?)", (serial,))
+      conn.commit()
+      r = None
+    if not r:
+      cur.execute("SELECT id FROM drive_serials WHERE serial = ?", (serial,))
+      r = cur.fetchone()
     if r:
       cache[key] = r[0]
       return r[0]
@@ -797,19 +943,37 @@ def _populate_disk_by_id(conn, scan_run_id):
     return None
 
 
+# scan_run_state.queue holds the remaining paths joined by NUL (a character
+# no path can contain) behind a leading NUL marker; older rows hold a JSON list
+QUEUE_SEP = "\0"
+
+
+def encode_scan_queue(queue):
+  return QUEUE_SEP + QUEUE_SEP.join(queue)
+
+
+def decode_scan_queue(text):
+  if not text:
+    return []
+  if text.startswith(QUEUE_SEP):
+    return text[1:].split(QUEUE_SEP) if len(text) > 1 else []
+  # legacy JSON list
+  return json.loads(text)
+
+
 def save_scan_state(conn, scan_run_id, queue, processed, last_path):
   """Persist the current scan queue and progress for a given scan_run_id.
 
-  queue: a deque or list of remaining paths (will be JSON-encoded as a list)
+  queue: a deque or list of remaining paths (stored via encode_scan_queue)
   processed: integer count of processed entries so far
   last_path: most recently processed path (string or None)
   """
   try:
-    qlist = list(queue) if queue is not None else []
+    qtext = encode_scan_queue(queue if queue is not None else ())
     cur = conn.cursor()
     cur.execute(
       "INSERT OR REPLACE INTO scan_run_state(scan_run_id, queue, processed, last_path, saved_at) VALUES (?, ?, ?, ?, ?)",
-      (scan_run_id, json.dumps(qlist), processed, last_path, time.time()),
+      (scan_run_id, qtext, processed, last_path, time.time()),
     )
     conn.commit()
   except Exception:
@@ -825,8 +989,8 @@ def load_scan_state(conn, scan_run_id):
     r = cur.fetchone()
     if not r:
       return None
-    qjson, processed, last_path = r
-    qlist = json.loads(qjson) if qjson else []
+    qtext, processed, last_path = r
+    qlist = decode_scan_queue(qtext)
     return (qlist, processed or 0, last_path)
   except Exception:
     return None
@@ -851,8 +1015,230 @@ def record_run_end(conn, run_id):
   finished = time.time()
   conn.execute("UPDATE scan_runs SET finished_at = ? WHERE id = ?", (finished, run_id))
   conn.commit()
+  conn.executescript(SCHEMA_INDEXES)
+
+# per-thread read buffer for hash_file's fallback loop (hashing runs on a pool)
+_hash_local = threading.local()
+
 
-def scan(root, conn, batch_size=BATCH_SIZE, silent=False, compute_hash=False, comment=None, scan_args=None, resume_run_id=None, resume_queue=None, resume_processed=0, resume_last_path=None):
+def hash_algo_available(algo):
+  """Return True if the package behind a HASH_ALGOS entry is importable."""
+  if algo == 'blake3':
+    return blake3 is not None
+  if algo == 'xxh3':
+    return xxhash is not None
+  return algo == 'sha256'
+
+
+def hash_file(path, algo='sha256'):
+  """Return the content digest of a file as stored in content_hashes.
+
+  sha256 gives the bare hex digest; blake3/xxh3 give "<algo>:<hex>".
+  Files are read, never mmap'ed: a file truncated while mapped would kill
+  the scan with SIGBUS, and a live tree has logs truncated in place.
+  """
+  with open(path, 'rb', buffering=0) as fh:
+    try:
+      # the whole file is read front to back; let the kernel read ahead harder
+      os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except (AttributeError, OSError):
+      pass
+    if algo == 'sha256':
+      try:
+        # Python 3.11+: reads into its own buffer and hashes with the GIL released
+        return hashlib.file_digest(fh, 'sha256').hexdigest()
+      except AttributeError:
+        pass
+      h = hashlib.sha256()
+    elif algo == 'blake3':
+      # splits each 1 MiB update across threads
+      h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    else:
+      h = xxhash.xxh3_128()
+    buf = getattr(_hash_local, 'buf', None)
+    if buf is None:
+      buf = _hash_local.buf = memoryview(bytearray(1 << 20))
+    # read in 1 MiB chunks into the reused buffer
+    while True:
+      n = fh.readinto(buf)
+      if not n:
+        break
+      h.update(buf[:n])
+  if algo == 'sha256':
+    return h.hexdigest()
+  return algo + ':' + h.hexdigest()
+
+
+def _list_dir(path, skip):
+  """Read one directory for scan() on a worker thread.
+
+  Returns a list of (full path, DirEntry, stat_result) for entries that are
+  not skipped. Entries that vanish or can't be stat'ed are dropped; errors
+  opening the directory itself propagate to the caller.
+
+  The directory is opened once and listed through its fd, so each entry's
+  stat is an fstatat() relative to it instead of a walk from '/'.
+  """
+  entries = []
+  prefix = path if path.endswith(os.sep) else path + os.sep
+  fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | getattr(os, 'O_CLOEXEC', 0))
+  try:
+    with os.scandir(fd) as it:
+      for entry in it:
+        if STOP_REQUESTED:
+          break
+        # symlinks are not recorded; is_symlink() answers from the cached
+        # d_type, so they are dropped before paying for a stat
+        if entry.is_symlink():
+          continue
+        full = prefix + entry.name
+        # skip entries that are in or under a configured skip dir
+        # or that match a relative-skip pattern under the scan root
+        if skip(full + os.sep):
+          continue
+        try:
+          st = entry.stat(follow_symlinks=False)
+        except (FileNotFoundError, PermissionError):
+          # skip items that disappear or are inaccessible
+          continue
+        entries.append((full, entry, st))
+  finally:
+    os.close(fd)
+  return entries
+
+
+_hash_error_lock = threading.Lock()
+
+
+def _hash_error(hash_errors, path, e):
+  """Count a file that couldn't be hashed; report the first HASH_ERROR_LOG_MAX on stderr.
+
+  hash_errors is a one-element list shared by the scan loop and the DB writer.
+  """
+  with _hash_error_lock:
+    hash_errors[0] += 1
+    n = hash_errors[0]
+  if n <= HASH_ERROR_LOG_MAX:
+    sys.stderr.write(f"hash error {path}: {e}\n")
+    if n == HASH_ERROR_LOG_MAX:
+      sys.stderr.write("further hash errors are only counted\n")
+
+
+def _wait_hashes(batch, hash_errors, failed=None):
+  """Collect the digests queued in a batch; returns {row index: hex digest or None}.
+
+  A row's content_hash_id slot holds a hex digest (hashed inline), a Future
+  from the hash pool, or already an id/None. Hardlinks share one Future, so
+  each is resolved once per batch, and a failed one is reported only the
+  first time it is seen (`failed` carries those across batches).
+  """
+  if failed is None:
+    failed = set()
+  digests = {}
+  # id(Future) -> digest; the Futures stay referenced by the batch meanwhile
+  resolved = {}
+  for i, row in enumerate(batch):
+    fut = row[HASH_ID_COL]
+    if isinstance(fut, str):
+      digests[i] = fut
+    elif isinstance(fut, Future):
+      key = id(fut)
+      if key not in resolved:
+        try:
+          resolved[key] = fut.result()
+        except Exception as e:
+          if fut not in failed:
+            failed.add(fut)
+            _hash_error(hash_errors, row[3] + os.sep + row[4], e)
+          resolved[key] = None
+      digests[i] = resolved[key]
+  return digests
+
+
+def _fill_hash_ids(cur, batch, digests, known):
+  """Normalize digests into content_hashes and put their ids into the batch rows.
+
+  New digests are inserted with one executemany and their ids read back
+  with chunked IN queries. `known` maps digest -> id across batches.
+  """
+  unknown = list({h for h in digests.values() if h is not None and h not in known})
+  if unknown:
+    try:
+      cur.executemany("INSERT OR IGNORE INTO content_hashes(content_hash) VALUES (?)", [(h,) for h in unknown])
+      for i in range(0, len(unknown), 500):
+        chunk = unknown[i:i + 500]
+        cur.execute(
+          "SELECT content_hash, id FROM content_hashes WHERE content_hash IN (%s)" % ",".join("?" * len(chunk)),
+          chunk,
+        )
+        known.update(cur.fetchall())
+    except Exception:
+      pass
+  for i, content_hash in digests.items():
+    row = batch[i]
+    batch[i] = row[:HASH_ID_COL] + (known.get(content_hash),) + row[HASH_ID_COL + 1:]
+
+
+def _insert_rows(cur, batch):
+  """Upsert a batch of files rows, INSERT_ROWS_PER_STMT rows per statement."""
+  k = INSERT_ROWS_PER_STMT
+  whole = len(batch) - len(batch) % k
+  for i in range(0, whole, k):
+    cur.execute(INSERT_UPSERT_MULTI, list(itertools.chain.from_iterable(batch[i:i + k])))
+  if whole < len(batch):
+    cur.executemany(INSERT_UPSERT, batch[whole:])
+
+
+def _db_writer(conn, db_lock, batches, errors, hash_errors):
+  """Write row batches from `batches` into files until a None sentinel arrives.
+
+  Runs on its own thread so the scan loop doesn't wait for inserts and
+  commits. Rows whose content_hash_id holds a digest (or a Future for one)
+  get it interned into content_hashes here. A tuple item is a (run_id, queue, processed,
+  last_path) checkpoint, saved after every batch queued before it. Failures are
+  collected in `errors` for scan() to re-raise; the queue keeps being
+  drained so the producer never blocks on it.
+  """
+  cur = conn.cursor()
+  # content_hash -> id for digests this scan has seen
+  hash_ids = {}
+  # hash Futures already reported as failed (shared by hardlinks across batches)
+  failed_hashes = set()
+  while True:
+    batch = batches.get()
+    if batch is None:
+      return
+    if errors:
+      continue
+    try:
+      digests = None
+      if not isinstance(batch, tuple):
+        # wait for hashing without holding up other users of conn
+        digests = _wait_hashes(batch, hash_errors, failed_hashes)
+      with db_lock:
+        if isinstance(batch, tuple):
+          save_scan_state(conn, *batch)
+        else:
+          # take the write lock up front rather than upgrading mid-batch; the
+          # only other writer, get_drive_serial_for_dev() on the scan thread
+          # (also under db_lock), can leave its insert uncommitted if it fails
+          if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+          try:
+            if digests:
+              if len(hash_ids) > HASH_ID_CACHE_MAX:
+                hash_ids.clear()
+              _fill_hash_ids(cur, batch, digests, hash_ids)
+            _insert_rows(cur, batch)
+            conn.commit()
+          except Exception:
+            conn.rollback()
+            raise
+    except Exception as e:
+      errors.append(e)
+
+
+def scan(root, conn, batch_size=BATCH_SIZE, silent=False, compute_hash=False, hash_algo='sha256', comment=None, scan_args=None, resume_run_id=None, resume_queue=None, resume_processed=0, resume_last_path=None):
 
   root = os.path.abspath(root)
 
@@ -868,9 +1254,19 @@ def scan(root, conn, batch_size=BATCH_SIZE, silent=False, compute_hash=False, co
     print(f"Root path does not exist: {root}", file=sys.stderr)
     sys.exit(2)
 
+  # absolute and relative skip rules, resolved once into a single match
+  skip = skip_pattern(root, allow_mnt, allow_media).match
+
   cur       = conn.cursor()
   drive_serial_id_cache = {}
   batch     = []
+  # full batches go to a writer thread; every other use of conn in here
+  # holds db_lock while the writer is running
+  db_lock   = threading.Lock()
+  batches   = queue_mod.Queue(maxsize=WRITE_QUEUE_DEPTH)
+  write_errors = []
+  # files that couldn't be hashed (see _hash_error)
+  hash_errors = [0]
   # determine whether we're resuming an existing run or starting a new one
   # track whether we've already processed the first resumed directory
   resumed_first_dir = False
@@ -887,181 +1283,236 @@ def scan(root, conn, batch_size=BATCH_SIZE, silent=False, compute_hash=False, co
     processed = 0
     last_path = None
 
-  while queue:
-    if STOP_REQUESTED:
+  # with -H, a file whose dev/inode/size/mtime match a row already hashed in
+  # an earlier run takes that row's content_hash_id instead of being re-read
+  reuse_hashes = False
+  hash_prefix_len = 0 if hash_algo == 'sha256' else len(hash_algo) + 1
+  if compute_hash:
+    try:
+      cur.execute("SELECT 1 FROM files WHERE content_hash_id IS NOT NULL LIMIT 1")
+      if cur.fetchone():
+        # the lookup needs its index during the scan, not only at run end
+        conn.execute(INDEX_FILES_IDENT)
+        conn.commit()
+        reuse_hashes = True
+    except Exception:
+      reuse_hashes = False
+
+  writer = threading.Thread(target=_db_writer, args=(conn, db_lock, batches, write_errors, hash_errors), daemon=True)
+  writer.start()
+
+  # Directories at the head of the queue are listed and stat'ed ahead of time
+  # by a thread pool; results are consumed here strictly in queue order so
+  # the DB writes and the saved resume queue behave as in a serial walk.
+  pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS)
+  hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS) if compute_hash else None
+  hash_slots = threading.BoundedSemaphore(HASH_INFLIGHT_MAX)
+  # (st_dev, st_ino) -> content hash slot for hardlinked files already hashed
+  seen_inodes = {}
+  pending = deque()
+  current = None
+  next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
+
+  while queue or pending:
+    # a failed write means everything after it is discarded by the writer;
+    # stop walking and hashing and let the error surface below
+    if STOP_REQUESTED or write_errors:
       break
-    current = queue.popleft()
-    # skip any directory that is in or under a configured absolute skip dir
-    # or if it matches a relative skip pattern under the scan root
-    if is_skipped_path(current, allow_mnt, allow_media) or is_rel_skipped(current, root):
+    while queue and len(pending) < SCAN_WORKERS * 2:
+      d = queue.popleft()
+      # skip any directory that is in or under a configured absolute skip dir
+      # or if it matches a relative skip pattern under the scan root
+      if skip(d + os.sep):
+        continue
+      pending.append((d, pool.submit(_list_dir, d, skip)))
+    if not pending:
       continue
+    current, listing = pending.popleft()
     try:
-      with os.scandir(current) as it:
-        # decide whether this directory is the first resumed directory
-        is_first_dir = False
-        if resume_run_id is not None and not resumed_first_dir:
-          is_first_dir = True
-
-        for entry in it:
-          if STOP_REQUESTED:
-            break
-
-          full = entry.path
-
-          # skip entries that are in or under a configured skip dir
-          # or that match a relative-skip pattern under the scan root
-          if is_skipped_path(full, allow_mnt, allow_media) or is_rel_skipped(full, root):
-            continue
-          try:
-            st = entry.stat()
-          except (FileNotFoundError, PermissionError):
-            # skip items that disappear or are inaccessible
-            continue
-
-          # get block device majors early (used for first-dir lookup)
-          try:
-            maj_probe = os.major(st.st_dev)
-            minr_probe = os.minor(st.st_dev)
-          except Exception:
-            maj_probe = None
-            minr_probe = None
-
-          is_dir      = 1 if entry.is_dir(follow_symlinks=False) else 0
-          is_file     = 1 if entry.is_file(follow_symlinks=False) else 0
-          is_symlink  = 1 if entry.is_symlink() else 0
-          link_target = None
+      entries = listing.result()
+      # decide whether this directory is the first resumed directory
+      is_first_dir = False
+      if resume_run_id is not None and not resumed_first_dir:
+        is_first_dir = True
+
+      subdirs = []
+      for full, entry, st in entries:
+        if STOP_REQUESTED:
+          break
 
-          if is_symlink:
-            continue
-            #try:
-            #  link_target = os.readlink(full)
-            #except OSError:
-            #  link_target = None
+        # integer stat fields in one unpack; the float times are only
+        # available as attributes (st[7:10] are truncated to seconds)
+        mode, ino, dev, nlink, uid, gid, size = st[:7]
 
-          dirpath = os.path.dirname(full)
-          name    = os.path.basename(full)
+        # block device numbers; os.major/minor can't fail on an lstat st_dev
+        dev_major = os.major(dev)
+        dev_minor = os.minor(dev)
 
-          # compute suffix: text after last '.' if present and not a leading-dot filename
-          suffix = None
+        # file type from the lstat mode already in hand
+        fmt         = mode & 0o170000
+        is_dir      = 1 if fmt == stat.S_IFDIR else 0
+        is_file     = 1 if fmt == stat.S_IFREG else 0
+        is_symlink  = 1 if fmt == stat.S_IFLNK else 0
+        link_target = None
 
-          try:
-            parts = name.rsplit('.', 1)
-            if len(parts) == 2 and parts[0] != '' and parts[1] != '':
-              suffix = parts[1]
-          except Exception:
-            suffix = None
-          # optionally compute content hash (sha256) for regular files
-          content_hash = None
-          content_hash_id = None
+        if is_symlink:
+          continue
+          #try:
+          #  link_target = os.readlink(full)
+          #except OSError:
+          #  link_target = None
+
+        # every row of a directory shares the one `current` string
+        dirpath = current
+        name    = entry.name
+
+        # compute suffix: text after last '.' if present and not a leading-dot filename
+        # (interned: a scan sees few distinct suffixes across many rows)
+        suffix = None
+        dot = name.rfind('.')
+        if 0 < dot < len(name) - 1:
+          suffix = sys.intern(name[dot + 1:])
+        # optionally compute content hash (sha256 unless --hash-algo) for regular files
+        # (metadata-only scans pay for just this None and one falsy test)
+        content_hash_id = None
+        if compute_hash and is_file:
           skip_hash = False
-          if compute_hash and is_file:
-            # If resuming and this is the first directory being reprocessed,
-            # check whether this file is already present for this run and reuse
-            # its content_hash_id to avoid re-reading large files.
-            if is_first_dir and maj_probe is not None and minr_probe is not None and resume_run_id is not None:
-              try:
+          # another link to an inode already seen in this scan: share its hash
+          # (digest, pending future or id) instead of reading the data again
+          if nlink > 1:
+            seen = seen_inodes.get((dev, ino))
+            if seen is not None:
+              content_hash_id = seen
+              skip_hash = True
+
+          # If resuming and this is the first directory being reprocessed,
+          # check whether this file is already present for this run and reuse
+          # its content_hash_id to avoid re-reading large files.
+          if is_first_dir and resume_run_id is not None and not skip_hash:
+            try:
+              with db_lock:
                 cur.execute(
                   "SELECT content_hash_id FROM files WHERE dev_major = ? AND dev_minor = ? AND ino = ? AND scan_run_id = ?",
-                  (maj_probe, minr_probe, st.st_ino, resume_run_id),
+                  (dev_major, dev_minor, ino, resume_run_id),
                 )
                 rr = cur.fetchone()
-                if rr and rr[0] is not None:
-                  content_hash_id = rr[0]
-                  skip_hash = True
-              except Exception:
-                skip_hash = False
-
-            if not skip_hash:
-              try:
-                h = hashlib.sha256()
-                # read in chunks
-                with open(full, 'rb') as fh:
-                  while True:
-                    chunk = fh.read(8192)
-                    if not chunk:
-                      break
-                    h.update(chunk)
-                content_hash = h.hexdigest()
-              except Exception as e:
-                print(f"An error occurred: {e}")
-                content_hash = None
-
-          # if we computed a content hash, normalize it into the content_hashes table
-          if content_hash is not None:
-            try:
-              # insert-or-ignore then select the id
-              cur.execute("INSERT OR IGNORE INTO content_hashes(content_hash) VALUES (?)", (content_hash,))
-              cur.execute("SELECT id FROM content_hashes WHERE content_hash = ?", (content_hash,))
-              r = cur.fetchone()
-              if r:
-                content_hash_id = r[0]
+              if rr and rr[0] is not None:
+                content_hash_id = rr[0]
+                skip_hash = True
             except Exception:
-              content_hash_id = None
-
-          # determine drive_serial_id for this file's device (cache per-scan)
-          drive_serial_id = None
-          try:
-            maj   = os.major(st.st_dev)
-            minr  = os.minor(st.st_dev)
-            drive_serial_id = get_drive_serial_for_dev(conn, maj, minr, drive_serial_id_cache)
-          except Exception as e:
-            #print(f"An error occurred: {e}")
-            drive_serial_id = None
-          # placeholder for transfer_id - currently unused, set to None
-          transfer_id = None
-
-          row = (
-            os.major(st.st_dev),
-            os.minor(st.st_dev),
-            st.st_ino,
-            dirpath,
-            name,
-            suffix,
-            st.st_mode,
-            st.st_uid if hasattr(st, "st_uid") else None,
-            st.st_gid if hasattr(st, "st_gid") else None,
-            st.st_size,
-            st.st_atime,
-            st.st_mtime,
-            st.st_ctime,
-            is_dir,
-            is_file,
-            is_symlink,
-            link_target,
-            transfer_id,
-            content_hash_id,
-            run_id,
-            drive_serial_id,
-          )
-          batch.append(row)
-          processed += 1
-          # track most recent file path
-          last_path = full
+              skip_hash = False
 
-          # progress output every 1000 files
-          if not silent and processed % 1000 == 0:
+          if reuse_hashes and not skip_hash:
             try:
-              print(f"Scanned {processed} files. Recent: {last_path}")
+              with db_lock:
+                # only reuse digests of this run's algorithm: the ':' of an
+                # "<algo>:" prefix sits at its length (0 for bare sha256)
+                cur.execute(
+                  "SELECT f.content_hash_id FROM files f JOIN content_hashes ch ON ch.id = f.content_hash_id WHERE f.dev_major = ? AND f.dev_minor = ? AND f.ino = ? AND f.size = ? AND f.mtime = ? AND instr(ch.content_hash, ':') = ? ORDER BY f.scan_run_id DESC LIMIT 1",
+                  (dev_major, dev_minor, ino, size, st.st_mtime, hash_prefix_len),
+                )
+                rr = cur.fetchone()
+              if rr:
+                content_hash_id = rr[0]
+                skip_hash = True
             except Exception:
-              # don't let printing interrupt scanning
-              pass
+              skip_hash = False
+
+          if not skip_hash:
+            # larger files are hashed on the pool while the walk goes on;
+            # either way the DB writer swaps the digest for its content_hashes id
+            if size > HASH_INLINE_MAX:
+              hash_slots.acquire()
+              content_hash_id = hash_pool.submit(hash_file, full, hash_algo)
+              content_hash_id.add_done_callback(lambda _f: hash_slots.release())
+            else:
+              try:
+                content_hash_id = hash_file(full, hash_algo)
+              except Exception as e:
+                _hash_error(hash_errors, full, e)
+                content_hash_id = None
+
+          if nlink > 1 and content_hash_id is not None:
+            seen_inodes[(dev, ino)] = content_hash_id
+
+        # determine drive_serial_id for this file's device (cache per-scan);
+        # cached values are ids or None, so -1 marks a device not seen yet.
+        # get_drive_serial_for_dev handles its own probe/DB errors
+        drive_serial_id = drive_serial_id_cache.get((dev_major, dev_minor), -1)
+        if drive_serial_id == -1:
+          with db_lock:
+            drive_serial_id = get_drive_serial_for_dev(conn, dev_major, dev_minor, drive_serial_id_cache)
+        # placeholder for transfer_id - currently unused, set to None
+        transfer_id = None
+
+        row = (
+          dev_major,
+          dev_minor,
+          ino,
+          dirpath,
+          name,
+          suffix,
+          mode,
+          uid,
+          gid,
+          size,
+          st.st_atime,
+          st.st_mtime,
+          st.st_ctime,
+          is_dir,
+          is_file,
+          is_symlink,
+          link_target,
+          transfer_id,
+          content_hash_id,
+          run_id,
+          drive_serial_id,
+        )
+        batch.append(row)
+        processed += 1
+        # track most recent file path
+        last_path = full
+
+        # progress output every 1000 files
+        if not silent and processed % 1000 == 0:
+          try:
+            print(f"Scanned {processed} files. Recent: {last_path}")
+          except Exception:
+            # don't let printing interrupt scanning
+            pass
 
-          if is_dir and not is_symlink:
-            # queue subdirectory for traversal (but only if not under a skip dir
-            # or relative skip pattern)
-            if not (is_skipped_path(full, allow_mnt, allow_media) or is_rel_skipped(full, root)):
-              queue.append(full)
+        if is_dir and not is_symlink:
+          # queue subdirectory for traversal (but only if not under a skip dir
+          # or relative skip pattern)
+          if not skip(full + os.sep):
+            subdirs.append(full)
 
-          if len(batch) >= batch_size:
-            cur.executemany(INSERT_UPSERT, batch)
-            conn.commit()
-            batch.clear()
-        # end for
-        if STOP_REQUESTED:
-          break
-        # finished processing this directory; mark that we've handled the resumed-first directory
-        if is_first_dir:
-          resumed_first_dir = True
+        if len(batch) >= batch_size:
+          batches.put(batch)
+          batch = []
+          if write_errors:
+            break
+      # end for
+      if STOP_REQUESTED or write_errors:
+        # current is re-listed on resume, so its subdirs are found again
+        break
+      # approximately depth-first: a directory's children go to the front of
+      # the queue, so they are walked before its remaining siblings, except
+      # the siblings already read ahead into `pending`, which come first.
+      # This keeps the queue short and neighbouring inodes together
+      queue.extendleft(reversed(subdirs))
+
+      if time.monotonic() >= next_checkpoint:
+        # everything up to and including current is in batch or earlier, so
+        # the state lands right after those rows; the writer serializes it
+        if batch:
+          batches.put(batch)
+          batch = []
+        batches.put((run_id, [d for d, _ in pending] + list(queue), processed, last_path))
+        next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
+      # finished processing this directory; mark that we've handled the resumed-first directory
+      if is_first_dir:
+        resumed_first_dir = True
     except PermissionError:
       # skip directories we can't enter
       continue
@@ -1072,16 +1523,38 @@ def scan(root, conn, batch_size=BATCH_SIZE, silent=False, compute_hash=False, co
       # other OS errors skip
       continue
 
+  for _, listing in pending:
+    listing.cancel()
+  pool.shutdown(wait=True)
+
   if batch:
-    cur.executemany(INSERT_UPSERT, batch)
-    conn.commit()
+    batches.put(batch)
+  batches.put(None)
+  writer.join()
+  if hash_pool is not None:
+    if write_errors:
+      # nothing more will be written; drop hashes that haven't started
+      try:
+        hash_pool.shutdown(wait=True, cancel_futures=True)
+      except TypeError:
+        # Python < 3.9
+        hash_pool.shutdown(wait=True)
+    else:
+      hash_pool.shutdown(wait=True)
+  if hash_errors[0]:
+    print(f"{hash_errors[0]} file(s) could not be hashed", file=sys.stderr)
+  if write_errors:
+    raise write_errors[0]
 
   # If the scan was interrupted, save remaining queue/state and DO NOT mark finished
   if STOP_REQUESTED:
     try:
       # ensure the directory we were working on is preserved at the front
       try:
-        if 'current' in locals() and current is not None:
+        # directories already handed to the read-ahead pool haven't been
+        # recorded yet; they go back to the front of the queue in order
+        queue.extendleft(reversed([d for d, _ in pending]))
+        if current is not None:
           # put the current directory back on the left of the queue so resume
           # will re-enter it and continue processing any remaining entries
           if not (len(queue) > 0 and queue[0] == current):
@@ -1123,6 +1596,14 @@ def main():
   #print("\n")
   #print("\n")
 
+  # bare invocation: show the announcement and the usage hint without
+  # building the argument parser
+  if len(sys.argv) == 1:
+    if "ANNOUNCE_TEXT" in globals():
+      print(ANNOUNCE_TEXT)
+    print("Missing required ROOT argument. Use --help for usage.", file=sys.stderr)
+    sys.exit(2)
+
   args = parse_args()
   # Allow root to be omitted for early-only actions
   try:
@@ -1140,6 +1621,10 @@ def main():
   except Exception:
     pass
 
+  if getattr(args, 'compute_hash', False) and not hash_algo_available(args.hash_algo):
+    print(f"--hash-algo {args.hash_algo} requires the {'xxhash' if args.hash_algo == 'xxh3' else args.hash_algo} package", file=sys.stderr)
+    sys.exit(2)
+
   # --license prints bundled LICENSE_TEXT and exits early
   try:
     if getattr(args, 'license', False):
@@ -1360,12 +1845,19 @@ def main():
     args_root = saved_args.get('root') if isinstance(saved_args, dict) else None
     args_silent = saved_args.get('silent') if isinstance(saved_args, dict) else None
     args_compute_hash = saved_args.get('compute_hash') if isinstance(saved_args, dict) else None
+    args_hash_algo = saved_args.get('hash_algo') if isinstance(saved_args, dict) else None
     args_comment = saved_args.get('comment') if isinstance(saved_args, dict) else None
     args_name = saved_args.get('name') if isinstance(saved_args, dict) else None
     # use these when calling scan
     resume_root = args_root or args.root
     resume_silent = bool(args_silent) if args_silent is not None else args.silent
     resume_compute_hash = bool(args_compute_hash) if args_compute_hash is not None else getattr(args, 'compute_hash', False)
+    # runs saved before --hash-algo existed were sha256
+    resume_hash_algo = args_hash_algo or 'sha256'
+    if resume_compute_hash and not hash_algo_available(resume_hash_algo):
+      print(f"Run {resume_run_id} hashes with {resume_hash_algo}, which is not available here", file=sys.stderr)
+      conn.close()
+      sys.exit(2)
     resume_comment = args_comment if args_comment is not None else getattr(args, 'comment', None)
   else:
     # not resumeing: prepare saved scan args to persist
@@ -1374,6 +1866,7 @@ def main():
       'db': args.db,
       'silent': args.silent,
       'compute_hash': getattr(args, 'compute_hash', False),
+      'hash_algo': getattr(args, 'hash_algo', 'sha256'),
       'comment': getattr(args, 'comment', None),
       'name': getattr(args, 'name', None),
     }
@@ -1407,6 +1900,7 @@ def main():
         conn,
         silent=resume_silent,
         compute_hash=resume_compute_hash,
+        hash_algo=resume_hash_algo,
         comment=resume_comment,
         resume_run_id=resume_run_id,
         resume_queue=resume_queue,
@@ -1419,6 +1913,7 @@ def main():
         conn,
         silent=args.silent,
         compute_hash=getattr(args, 'compute_hash', False),
+        hash_algo=getattr(args, 'hash_algo', 'sha256'),
         comment=getattr(args, 'comment', None),
         scan_args=saved_args,
       )
@@ -24,6 +24,10 @@ import signal
 import shutil
 import stat
 import errno
+import codecs
+import collections
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
 from lib.LICENSE_fsgui import LICENSE_TEXT
 
@@ -33,6 +37,29 @@ DB_VERSION = "1.1"
 
 VERSION_NOTE = """Change order of tabs"""
 
+# maximum number of lines kept in the scan/resume/hardlink output panes;
+# older lines are dropped so long runs don't grow the document forever
+OUTPUT_MAX_BLOCKS = 20000
+
+# transferred rows written to the target DB per commit
+TRANSFER_COMMIT_EVERY = 500
+# checked files whose source rows are fetched per query (2 params each,
+# kept under SQLite's old 999-parameter limit)
+TRANSFER_PREFETCH_ROWS = 400
+# minimum seconds between transfer file_progress signals; each one is a
+# queued event plus a label repaint on the GUI thread
+PROGRESS_EMIT_INTERVAL = 0.05
+# parallel file copies per transfer
+TRANSFER_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# missing-file rows fetched per batch by CompareWorker (progress is sent per batch)
+COMPARE_FETCH_ROWS = 10000
+
+# answer --version before importing Qt: loading the toolkit's shared libraries
+# dominates startup and isn't needed to print the version
+if __name__ == '__main__' and '--version' in sys.argv[1:]:
+    print(VERSION)
+    sys.exit(0)
+
 
 
 try:
@@ -54,6 +81,202 @@ except Exception:
 Signal = getattr(QtCore, 'pyqtSignal', getattr(QtCore, 'Signal', None))
 
 
+# files at least this large are copied with page-cache hints so a big transfer
+# doesn't evict everything else (including the DBs' pages)
+COPY_FADVISE_MIN = 1024 * 1024
+
+# version of the transfer-side schema (transfers table, files.transfer_id,
+# content hash index) recorded in a target DB's PRAGMA user_version; bump it
+# when _migrate_target() gains a step
+_TARGET_SCHEMA_VERSION = 1
+
+# transfer writes to the target; kept as constants so every batch reuses the
+# same prepared statement from the connection's statement cache
+_INSERT_FILES_SQL = "INSERT OR REPLACE INTO files(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# for older target schemas without files.drive_serial_id
+_INSERT_FILES_NODS_SQL = "INSERT OR REPLACE INTO files(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_HISTORY_SQL = "INSERT OR IGNORE INTO files_history(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def _migrate_target(conn):
+    """Create/upgrade the transfer tables, columns and indexes in a target DB.
+
+    Runs as one transaction that also stamps PRAGMA user_version, so a target
+    is only marked current once every step has been committed; on failure the
+    transaction is rolled back and the error is raised.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transfers (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              name TEXT,
+              source_db_path TEXT,
+              source_scan_run_id INTEGER,
+              target_db_path TEXT,
+              target_scan_run_id INTEGER,
+              started_at REAL,
+              finished_at REAL,
+              hostname TEXT,
+              os_id TEXT,
+              hardware_id TEXT,
+              passwd_ctime REAL,
+              current_dir TEXT,
+              db_version TEXT
+            )
+            """
+        )
+
+        # transfers.name and transfers.db_version (for older transfer tables)
+        cur.execute("PRAGMA table_info(transfers)")
+        tr_cols = [r[1] for r in cur.fetchall()]
+        for col in ('name', 'db_version'):
+            if col not in tr_cols:
+                cur.execute(f"ALTER TABLE transfers ADD COLUMN {col} TEXT")
+
+        # content lookup for cloning items already present in the target run
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files(content_hash_id)")
+
+        # transfer_id column in target files table
+        cur.execute("PRAGMA table_info(files)")
+        if 'transfer_id' not in [r[1] for r in cur.fetchall()]:
+            cur.execute("ALTER TABLE files ADD COLUMN transfer_id INTEGER")
+
+        cur.execute(f"PRAGMA user_version={_TARGET_SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+
+
+def _path_under(path, root):
+    """Return path relative to root, or None if it isn't under root.
+
+    Both must already be absolute and normalized (os.path.abspath); this is
+    the string-only equivalent of comparing os.path.commonpath to root.
+    """
+    if path == root:
+        return '.'
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return None
+
+
+def _append_name(dirpath, name):
+    """os.path.join for a normalized absolute dirpath and a plain name."""
+    return dirpath + name if dirpath.endswith(os.sep) else dirpath + os.sep + name
+
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+
+def _file_matches(path, size, mtime):
+    """True if path is a regular file whose size and mtime match a DB row."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_size == size and st.st_mtime == mtime
+
+
+def _clone_file(src_path, dst_path):
+    """Reflink src_path into a new dst_path; return False if that isn't possible.
+
+    Only a real clone counts: no bytes are copied, so on filesystems without
+    reflink support the caller falls back to an ordinary copy.
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        in_fd = os.open(src_path, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        out_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            fcntl.ioctl(out_fd, FICLONE, in_fd)
+            return True
+        except OSError:
+            pass
+        finally:
+            os.close(out_fd)
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+        return False
+    except OSError:
+        return False
+    finally:
+        os.close(in_fd)
+
+
+# copy_file_range errors meaning "not supported here" rather than a real I/O failure
+_COPY_RANGE_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
+
+
+def _fast_copy(src_path, dst_path):
+    """Copy file data from src_path to dst_path without going through userspace.
+
+    Uses os.copy_file_range, which lets the kernel copy in place (or reflink
+    / copy server-side where the filesystem supports it). Falls back to
+    shutil.copyfile when it isn't available or supported for this pair.
+    Large files are read with a sequential hint and dropped from the page
+    cache afterwards; dropping the target also starts its writeback early.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        shutil.copyfile(src_path, dst_path)
+        return
+    copied = None
+    # O_NONBLOCK so a FIFO at src_path can't hang the open; copyfile rejects it below
+    in_fd = os.open(src_path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        st = os.fstat(in_fd)
+        if stat.S_ISREG(st.st_mode):
+            hint = st.st_size >= COPY_FADVISE_MIN and hasattr(os, 'posix_fadvise')
+            if hint:
+                try:
+                    os.posix_fadvise(in_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+            out_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                copied = 0
+                while True:
+                    try:
+                        n = os.copy_file_range(in_fd, out_fd, 1 << 30)
+                    except OSError as e:
+                        if copied == 0 and e.errno in _COPY_RANGE_UNSUPPORTED:
+                            copied = None
+                            break
+                        raise
+                    if n == 0:
+                        break
+                    copied += n
+                # some filesystems report 0 bytes instead of an error
+                if copied == 0 and st.st_size > 0:
+                    copied = None
+                if hint and copied:
+                    for fd in (in_fd, out_fd):
+                        try:
+                            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                        except OSError:
+                            pass
+            finally:
+                os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    if copied is None:
+        shutil.copyfile(src_path, dst_path)
+
+
 class TransferWorker(QtCore.QThread):
     """Worker thread to transfer checked files from source DB to target DB.
 
@@ -74,57 +297,70 @@ class TransferWorker(QtCore.QThread):
         self.db_tgt = db_tgt
         self.run_src = run_src
         self.run_tgt = run_tgt
-        self.checked_files = list(checked_files)
+        # grouped by directory so copies, directory creation and the source/target
+        # B-tree lookups walk the tree in order
+        self.checked_files = sorted(checked_files)
         # optional override for the source run root (resolved mountpoint)
         self.src_root_override = src_root_override
         # optional override for the target run root (resolved mountpoint)
         self.tgt_root_override = tgt_root_override
         self._cancelled = False
-        # synchronization for handling first-error user decision (abort/continue)
-        try:
-            self._error_action = None  # 'abort' or 'continue'
-            self._error_action_event = threading.Event()
-        except Exception:
-            self._error_action = None
-            self._error_action_event = None
+        # source id -> target id for content_hashes / drive_serials
+        self._ch_cache = {}
+        self._ds_cache = {}
+        # target directories known to exist, so each is created once
+        self._mkdir_cache = set()
+        # synchronization for handling first-error user decision (abort/continue);
+        # the GUI answers through set_error_action(), which feeds the queue
+        self._error_action = None  # 'abort' or 'continue'
+        self._error_q = queue.Queue()
+        # copies run in parallel; only one error prompt is shown at a time
+        self._error_lock = threading.Lock()
 
     def _handle_error_and_wait(self, msg: str):
         """Emit error message and wait for GUI to set an action.
 
-        Returns the action string set by GUI ('abort' or 'continue'), or
-        None if canceled or timeout.
+        Returns the action string set by GUI ('abort' or 'continue'; cancel()
+        answers 'abort'), or None if the transfer was already cancelled.
+        Anything but 'continue' also marks the worker cancelled.
         """
-        try:
+        with self._error_lock:
+            # another copy's error may have aborted the transfer meanwhile
+            if getattr(self, '_cancelled', False):
+                return None
+            # drop a stale wake-up left by cancel() or a late answer
+            try:
+                while True:
+                    self._error_q.get_nowait()
+            except queue.Empty:
+                pass
             # emit the message to GUI
             try:
                 self.error.emit(msg)
             except Exception:
                 pass
-            # reset prior action and event
+            # block until the GUI answers or cancel() wakes us
             try:
-                if self._error_action_event is not None:
-                    self._error_action = None
-                    self._error_action_event.clear()
+                action = self._error_q.get()
             except Exception:
-                pass
-            # wait until GUI sets the decision or we are cancelled
-            while not getattr(self, '_cancelled', False):
-                try:
-                    if self._error_action_event is None:
-                        break
-                    # wait up to 0.1s and loop to check _cancelled
-                    if self._error_action_event.wait(0.1):
-                        break
-                except Exception:
-                    break
-            return getattr(self, '_error_action', None)
-        except Exception:
-            return None
+                action = None
+            # anything but 'continue' aborts; flag it before releasing the
+            # lock so copies queued behind this prompt don't raise their own
+            if action != 'continue':
+                self._cancelled = True
+            return action
+
+    def set_error_action(self, action):
+        """Answer the pending error prompt from the GUI thread ('abort' or 'continue')."""
+        self._error_action = action
+        self._error_q.put(action)
 
     def cancel(self):
         """Request cancellation from the GUI thread. The worker will check the flag between files."""
         try:
             self._cancelled = True
+            # wake a copy blocked on an error prompt
+            self._error_q.put('abort')
         except Exception:
             pass
 
@@ -136,66 +372,41 @@ class TransferWorker(QtCore.QThread):
             self.error.emit(f"Failed to open DBs: {e}")
             return
 
-        try:
-            src_cur = src_conn.cursor()
-            tgt_cur = tgt_conn.cursor()
-
-            # ensure transfers table exists in target
+        # WAL + relaxed sync on the target so commits don't fsync-block the
+        # GUI's readers; the source is only read here
+        if not str(self.db_tgt).endswith(':memory:'):
+            for pragma in ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA busy_timeout=5000",
+                           "PRAGMA temp_store=MEMORY", "PRAGMA cache_size=-65536"):
+                try:
+                    tgt_conn.execute(pragma)
+                except Exception:
+                    pass
+        for pragma in ("PRAGMA query_only=1", "PRAGMA cache_size=-65536"):
             try:
-                tgt_cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS transfers (
-                      id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      name TEXT,
-                      source_db_path TEXT,
-                      source_scan_run_id INTEGER,
-                      target_db_path TEXT,
-                      target_scan_run_id INTEGER,
-                      started_at REAL,
-                      finished_at REAL,
-                      hostname TEXT,
-                      os_id TEXT,
-                      hardware_id TEXT,
-                      passwd_ctime REAL,
-                                            current_dir TEXT,
-                                            db_version TEXT
-                    )
-                    """
-                )
-                tgt_conn.commit()
+                src_conn.execute(pragma)
             except Exception:
-                # non-fatal
                 pass
 
-            # ensure transfers.name and transfers.db_version columns exist (for older transfer tables)
+        try:
+            src_cur = src_conn.cursor()
+            tgt_cur = tgt_conn.cursor()
+
+            # bring an older target schema up to date; skipped once the
+            # target records the current schema version
             try:
-                tgt_cur.execute("PRAGMA table_info(transfers)")
-                tr_cols = [r[1] for r in tgt_cur.fetchall()]
-                if 'name' not in tr_cols:
-                    try:
-                        tgt_cur.execute("ALTER TABLE transfers ADD COLUMN name TEXT")
-                        tgt_conn.commit()
-                    except Exception:
-                        pass
-                if 'db_version' not in tr_cols:
-                    try:
-                        tgt_cur.execute("ALTER TABLE transfers ADD COLUMN db_version TEXT")
-                        tgt_conn.commit()
-                    except Exception:
-                        pass
+                v = tgt_cur.execute("PRAGMA user_version").fetchone()[0]
+                if v < _TARGET_SCHEMA_VERSION:
+                    _migrate_target(tgt_conn)
             except Exception:
+                # non-fatal: the version stays unset so the next transfer
+                # retries; writes below fail on their own if the schema is short
                 pass
 
-            # ensure transfer_id column present in target files table
+            # older target schemas may lack drive_serial_id
+            tgt_cols = []
             try:
                 tgt_cur.execute("PRAGMA table_info(files)")
                 tgt_cols = [r[1] for r in tgt_cur.fetchall()]
-                if 'transfer_id' not in tgt_cols:
-                    try:
-                        tgt_cur.execute("ALTER TABLE files ADD COLUMN transfer_id INTEGER")
-                        tgt_conn.commit()
-                    except Exception:
-                        pass
             except Exception:
                 pass
 
@@ -251,6 +462,9 @@ class TransferWorker(QtCore.QThread):
             def map_content_hash(src_ch_id):
                 if not src_ch_id:
                     return None
+                cached = self._ch_cache.get(src_ch_id)
+                if cached is not None:
+                    return cached
                 try:
                     src_cur.execute("SELECT content_hash FROM content_hashes WHERE id = ?", (src_ch_id,))
                     r = src_cur.fetchone()
@@ -258,16 +472,21 @@ class TransferWorker(QtCore.QThread):
                         return None
                     ch = r[0]
                     tgt_cur.execute("INSERT OR IGNORE INTO content_hashes(content_hash) VALUES (?)", (ch,))
-                    tgt_conn.commit()
                     tgt_cur.execute("SELECT id FROM content_hashes WHERE content_hash = ?", (ch,))
                     rr = tgt_cur.fetchone()
-                    return rr[0] if rr else None
+                    if not rr:
+                        return None
+                    self._ch_cache[src_ch_id] = rr[0]
+                    return rr[0]
                 except Exception:
                     return None
 
             def map_drive_serial(src_ds_id):
                 if not src_ds_id:
                     return None
+                cached = self._ds_cache.get(src_ds_id)
+                if cached is not None:
+                    return cached
                 try:
                     src_cur.execute("SELECT serial FROM drive_serials WHERE id = ?", (src_ds_id,))
                     r = src_cur.fetchone()
@@ -275,103 +494,379 @@ class TransferWorker(QtCore.QThread):
                         return None
                     serial = r[0]
                     tgt_cur.execute("INSERT OR IGNORE INTO drive_serials(serial) VALUES (?)", (serial,))
-                    tgt_conn.commit()
                     tgt_cur.execute("SELECT id FROM drive_serials WHERE serial = ?", (serial,))
                     rr = tgt_cur.fetchone()
-                    return rr[0] if rr else None
+                    if not rr:
+                        return None
+                    self._ds_cache[src_ds_id] = rr[0]
+                    return rr[0]
                 except Exception:
                     return None
 
-            for idx, (dirpath, name) in enumerate(self.checked_files):
-                # check cancellation flag between items
-                if getattr(self, '_cancelled', False):
-                    break
+            # target files rows are buffered and written with executemany
+            use_ds = 'drive_serial_id' in tgt_cols or not tgt_cols
+            insert_files_sql = _INSERT_FILES_SQL if use_ds else _INSERT_FILES_NODS_SQL
+            pending_file_rows = []
+            # archived copies of replaced target rows, written ahead of the files batch
+            pending_history_rows = []
+
+            def flush_files():
+                # write buffered rows and commit; runs every TRANSFER_COMMIT_EVERY
+                # rows and once more before the transfer is closed out
+                nonlocal transferred
+                if pending_history_rows:
+                    rows = list(pending_history_rows)
+                    pending_history_rows.clear()
+                    try:
+                        tgt_cur.executemany(_INSERT_HISTORY_SQL, rows)
+                    except Exception:
+                        for row in rows:
+                            try:
+                                tgt_cur.execute(_INSERT_HISTORY_SQL, row)
+                            except Exception:
+                                pass
+                if pending_file_rows:
+                    rows = list(pending_file_rows)
+                    pending_file_rows.clear()
+                    try:
+                        tgt_cur.executemany(insert_files_sql, rows)
+                        transferred += len(rows)
+                    except Exception:
+                        # retry one by one so a bad row doesn't drop the batch
+                        for row in rows:
+                            try:
+                                tgt_cur.execute(insert_files_sql, row)
+                                transferred += 1
+                            except Exception:
+                                pass
                 try:
-                    src_cur.execute(
-                        "SELECT dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, content_hash_id, drive_serial_id FROM files WHERE scan_run_id = ? AND dirpath = ? AND name = ? LIMIT 1",
-                        (self.run_src, dirpath, name),
+                    tgt_conn.commit()
+                    tgt_conn.execute("BEGIN")
+                except Exception:
+                    pass
+
+            file_cols = "f.dev_major, f.dev_minor, f.ino, f.dirpath, f.name, f.suffix, f.mode, f.uid, f.gid, f.size, f.atime, f.mtime, f.ctime, f.is_dir, f.is_file, f.is_symlink, f.link_target, f.content_hash_id, f.drive_serial_id"
+            prefetched = {}
+            # cleared if a prefetch query fails; then fall back to per-file SELECTs
+            prefetch_ok = True
+
+            def prefetch_rows(start):
+                # load source rows for the next chunk of checked files in one query
+                nonlocal prefetch_ok
+                prefetched.clear()
+                keys = self.checked_files[start:start + TRANSFER_PREFETCH_ROWS]
+                if not keys or not prefetch_ok:
+                    return
+                try:
+                    params = []
+                    for d, n in keys:
+                        params.append(d)
+                        params.append(n)
+                    params.append(self.run_src)
+                    # CROSS JOIN keeps the VALUES list as the outer loop so each
+                    # key is a primary-key lookup rather than a scan of files
+                    # iterate the cursor rather than materializing fetchall()'s list
+                    for r in src_cur.execute(
+                        f"SELECT {file_cols} FROM (VALUES {', '.join(['(?, ?)'] * len(keys))}) AS p "
+                        "CROSS JOIN files f ON f.dirpath = p.column1 AND f.name = p.column2 AND f.scan_run_id = ?",
+                        params,
+                    ):
+                        prefetched.setdefault((r[3], r[4]), r)
+                except Exception:
+                    prefetch_ok = False
+
+            try:
+                tgt_conn.execute("BEGIN")
+            except Exception:
+                pass
+
+            # roots normalized once for the per-item path mapping in _copy_item
+            src_override = getattr(self, 'src_root_override', None) or None
+            abs_orig_src_root = os.path.abspath(orig_src_root) if orig_src_root else None
+            abs_src_root = os.path.abspath(src_root) if src_root else None
+            tgt_override = getattr(self, 'tgt_root_override', None) or None
+            abs_orig_tgt_root = os.path.abspath(orig_tgt_root) if orig_tgt_root else None
+
+            # target content id -> (path, size, mtime) of a file with that content
+            # already in the target run, or None. Only rows from the target's own
+            # scan qualify: transferred rows record the source path.
+            clone_sources = {}
+
+            def find_clone_source(tgt_ch_id):
+                if tgt_ch_id in clone_sources:
+                    return clone_sources[tgt_ch_id]
+                hit = None
+                try:
+                    tgt_cur.execute(
+                        "SELECT dirpath, name, size, mtime FROM files WHERE content_hash_id = ? AND scan_run_id = ? AND is_file = 1 AND transfer_id IS NULL LIMIT 1",
+                        (tgt_ch_id, self.run_tgt),
                     )
-                    r = src_cur.fetchone()
-                    if not r:
-                        # skip missing
-                        pass
+                    row = tgt_cur.fetchone()
+                    if row and abs_orig_tgt_root:
+                        path = os.path.join(row[0], row[1])
+                        rel = _path_under(os.path.abspath(path), abs_orig_tgt_root)
+                        if rel is not None:
+                            if tgt_override:
+                                # find it under the resolved mountpoint instead
+                                path = os.path.normpath(os.path.join(tgt_override, rel))
+                            hit = (path, row[2], row[3])
+                except Exception:
+                    hit = None
+                clone_sources[tgt_ch_id] = hit
+                return hit
+
+            def remember_dir(d):
+                # d now exists, and so does every ancestor; record them all
+                while d and d not in self._mkdir_cache:
+                    self._mkdir_cache.add(d)
+                    parent = os.path.dirname(d)
+                    if parent == d:
+                        break
+                    d = parent
+
+            def map_path(src_path_db):
+                # (source path, target path) for a DB path, general case
+                src_path = src_path_db
+                try:
+                    abs_src_path_db = os.path.abspath(src_path_db)
+                    # relative path under the DB-recorded root, if it is under it
+                    rel_db = _path_under(abs_src_path_db, abs_orig_src_root) if abs_orig_src_root else None
+                    if src_override and abs_orig_src_root:
+                        if rel_db is not None:
+                            src_path = os.path.normpath(os.path.join(src_override, rel_db))
+                        else:
+                            # fallback: join override with DB path stripped of leading /
+                            src_path = os.path.normpath(os.path.join(src_override, src_path_db.lstrip(os.path.sep)))
+                    # Determine target full path
+                    if tgt_root:
+                        # Prefer the relative path under the original DB-recorded
+                        # root so the target mirrors the scan's original layout;
+                        # then the effective src_root; otherwise mirror the
+                        # absolute path under the target root.
+                        rel = rel_db
+                        if rel is None and abs_src_root:
+                            rel = _path_under(os.path.abspath(src_path), abs_src_root)
+                        if rel is None:
+                            rel = src_path.lstrip(os.path.sep)
+                        tgt_path = os.path.normpath(os.path.join(tgt_root, rel))
                     else:
-                        (dev_major, dev_minor, ino, dirpath_s, name_s, suffix, mode, uid, gid, size, atime_v, mtime_v, ctime_v, is_dir_v, is_file_v, is_symlink_v, link_target, src_ch_id, src_ds_id) = r
-                        tgt_ch_id = map_content_hash(src_ch_id)
-                        tgt_ds_id = map_drive_serial(src_ds_id)
+                        # No target root known: attempt to copy to same absolute path
+                        tgt_path = src_path
+                except Exception:
+                    tgt_path = src_path
+                return src_path, tgt_path
 
-                        # Emit current filename being processed for UI
+            # dirpath -> (source dir or None, target dir or None) for items of a
+            # directory under the recorded source root; None means use map_path
+            dir_paths = {}
+
+            def map_dir(dirpath_s):
+                # items directly in dirpath_s map to these normalized directories
+                # plus their name, so the normalization runs once per directory
+                if not abs_orig_src_root:
+                    return None
+                try:
+                    rel_dir = _path_under(os.path.abspath(dirpath_s), abs_orig_src_root)
+                    if rel_dir is None:
+                        return None
+                    src_dir = os.path.normpath(os.path.join(src_override, rel_dir)) if src_override else None
+                    tgt_dir = os.path.normpath(os.path.join(tgt_root, rel_dir)) if tgt_root else None
+                    if any(d is not None and not os.path.isabs(d) for d in (src_dir, tgt_dir)):
+                        return None
+                    return src_dir, tgt_dir
+                except Exception:
+                    return None
+
+            # Attempt to copy the actual file/directory/symlink to the target filesystem
+            # Construct a sensible target path by mapping source run root -> target run root
+            def _copy_item(dirpath_s, name_s, mode, uid, gid, is_dir_v, is_file_v, is_symlink_v, link_target, size=None, mtime_v=None, clone=None):
+                # Construct the actual source filesystem path. If the user supplied
+                # a resolved-source override and the DB recorded an original root,
+                # translate the DB-stored path into the override mountpoint so we
+                # attempt to read the file from the correct device.
+                src_path_db = os.path.join(dirpath_s, name_s)
+                # common case: reuse the directory's mapping and append the name
+                mapped = dir_paths.get(dirpath_s, False)
+                if mapped is False:
+                    mapped = dir_paths[dirpath_s] = map_dir(dirpath_s)
+                if mapped is not None and name_s not in ('', '.', '..') and os.path.sep not in name_s:
+                    src_dir, tgt_dir = mapped
+                    src_path = _append_name(src_dir, name_s) if src_dir is not None else src_path_db
+                    tgt_path = _append_name(tgt_dir, name_s) if tgt_dir is not None else src_path
+                else:
+                    src_path, tgt_path = map_path(src_path_db)
+
+                # create parent directory (once per directory per transfer)
+                try:
+                    tgt_dir = os.path.dirname(tgt_path)
+                    if tgt_dir and tgt_dir not in self._mkdir_cache:
+                        os.makedirs(tgt_dir, exist_ok=True)
+                        remember_dir(tgt_dir)
+                except FileExistsError:
+                    # exists but isn't a directory; the copy below reports it
+                    pass
+                except PermissionError as e:
+                    # clearly handle permission errors on target
+                    try:
+                        action = self._handle_error_and_wait(f"Permission denied creating target directory {tgt_dir}: {e}")
+                    except Exception:
+                        action = None
+                    if action == 'continue':
+                        return False
+                    try:
+                        self._cancelled = True
+                    except Exception:
+                        pass
+                    return False
+                except OSError as e:
+                    try:
+                        action = self._handle_error_and_wait(f"Failed to create target directory {tgt_dir}: {e}")
+                    except Exception:
+                        action = None
+                    if action == 'continue':
+                        return False
+                    try:
+                        self._cancelled = True
+                    except Exception:
+                        pass
+                    return False
+
+                # handle symlink
+                if is_symlink_v:
+                    try:
+                        # remove existing target if any
+                        try:
+                            os.remove(tgt_path)
+                        except Exception:
+                            pass
+                        os.symlink(link_target, tgt_path)
+                        # try to preserve ownership of the symlink itself if possible
+                        # (skipped when the new link already has it)
+                        try:
+                            if hasattr(os, 'lchown') and uid is not None and gid is not None:
+                                st = os.lstat(tgt_path)
+                                if st.st_uid != uid or st.st_gid != gid:
+                                    os.lchown(tgt_path, uid, gid)
+                        except Exception:
+                            pass
+                        return True
+                    except PermissionError as e:
+                        try:
+                            action = self._handle_error_and_wait(f"Permission denied creating symlink {tgt_path}: {e}")
+                        except Exception:
+                            action = None
+                        if action == 'continue':
+                            return False
+                        try:
+                            self._cancelled = True
+                        except Exception:
+                            pass
+                        return False
+                    except OSError as e:
+                        try:
+                            action = self._handle_error_and_wait(f"Failed to create symlink {tgt_path}: {e}")
+                        except Exception:
+                            action = None
+                        if action == 'continue':
+                            return False
+                        try:
+                            self._cancelled = True
+                        except Exception:
+                            pass
+                        return False
+
+                # handle directory
+                if is_dir_v:
+                    try:
                         try:
-                            full = os.path.join(dirpath_s, name_s)
-                            self.file_progress.emit(full)
+                            if tgt_path not in self._mkdir_cache:
+                                os.makedirs(tgt_path, exist_ok=True)
+                                remember_dir(tgt_path)
+                        except FileExistsError:
+                            pass
+                        # only touch mode/ownership that differ from what's on disk
+                        try:
+                            st = os.lstat(tgt_path)
+                        except Exception:
+                            st = None
+                        try:
+                            want = (mode or 0o755) & 0o7777
+                            if st is None or stat.S_IMODE(st.st_mode) != want:
+                                os.chmod(tgt_path, want)
+                        except Exception:
+                            pass
+                        try:
+                            if uid is not None and gid is not None and (st is None or st.st_uid != uid or st.st_gid != gid):
+                                os.chown(tgt_path, uid, gid)
+                        except Exception:
+                            pass
+                        return True
+                    except PermissionError as e:
+                        try:
+                            action = self._handle_error_and_wait(f"Permission denied creating directory {tgt_path}: {e}")
+                        except Exception:
+                            action = None
+                        if action == 'continue':
+                            return False
+                        try:
+                            self._cancelled = True
+                        except Exception:
+                            pass
+                        return False
+                    except OSError as e:
+                        try:
+                            action = self._handle_error_and_wait(f"Failed to create directory {tgt_path}: {e}")
+                        except Exception:
+                            action = None
+                        if action == 'continue':
+                            return False
+                        try:
+                            self._cancelled = True
                         except Exception:
                             pass
+                        return False
 
-                        # Attempt to copy the actual file/directory/symlink to the target filesystem
-                        # Construct a sensible target path by mapping source run root -> target run root
-                        def _copy_item():
-                            # Construct the actual source filesystem path. If the user supplied
-                            # a resolved-source override and the DB recorded an original root,
-                            # translate the DB-stored path into the override mountpoint so we
-                            # attempt to read the file from the correct device.
-                            src_path_db = os.path.join(dirpath_s, name_s)
-                            src_path = src_path_db
+                # handle regular file copy
+                if is_file_v:
+                    base = tgt_path
+                    tmp = base + f".tmp-transfer-{os.getpid()}-{threading.get_ident()}-{int(time.time() * 1000)}"
+                    # perform copy of file data and basic metadata
+                    try:
+                        try:
+                            # same content already in the target run: reflink it when
+                            # both it and the source are unchanged since their scans
+                            if not (clone and _file_matches(clone[0], clone[1], clone[2])
+                                    and _file_matches(src_path, size, mtime_v) and _clone_file(clone[0], tmp)):
+                                _fast_copy(src_path, tmp)
+                        except PermissionError as e:
                             try:
-                                if getattr(self, 'src_root_override', None) and orig_src_root:
-                                    abs_db_root = os.path.abspath(orig_src_root)
-                                    abs_db_path = os.path.abspath(src_path_db)
-                                    # if the DB path is under the recorded root, compute relative
-                                    # path and join with override
-                                    if os.path.commonpath([abs_db_path, abs_db_root]) == abs_db_root:
-                                        rel_src = os.path.relpath(abs_db_path, abs_db_root)
-                                        src_path = os.path.normpath(os.path.join(self.src_root_override, rel_src))
-                                    else:
-                                        # fallback: join override with DB path stripped of leading /
-                                        src_path = os.path.normpath(os.path.join(self.src_root_override, src_path_db.lstrip(os.path.sep)))
+                                action = self._handle_error_and_wait(f"Permission denied copying {src_path} -> {tmp}: {e}")
                             except Exception:
-                                # on any error fall back to DB path
-                                src_path = src_path_db
-                            # Determine target full path
+                                action = None
                             try:
-                                if tgt_root:
-                                    # If src_root is known and src_path is under it, preserve relative layout
-                                    try:
-                                        # Prefer computing the relative path based on the original
-                                        # DB-recorded root so the directory layout in the target
-                                        # mirrors the scan's original layout. If that's not
-                                        # available, fall back to using the effective src_root.
-                                        abs_src_db_root = os.path.abspath(orig_src_root) if orig_src_root else None
-                                        abs_src_path_db = os.path.abspath(os.path.join(dirpath_s, name_s))
-                                        if abs_src_db_root and os.path.commonpath([abs_src_path_db, abs_src_db_root]) == abs_src_db_root:
-                                            rel = os.path.relpath(abs_src_path_db, abs_src_db_root)
-                                            tgt_path = os.path.normpath(os.path.join(tgt_root, rel))
-                                        elif src_root and os.path.commonpath([os.path.abspath(src_path), os.path.abspath(src_root)]) == os.path.abspath(src_root):
-                                            rel = os.path.relpath(src_path, src_root)
-                                            tgt_path = os.path.normpath(os.path.join(tgt_root, rel))
-                                        else:
-                                            # Otherwise, place under target root mirroring absolute path
-                                            rel = src_path.lstrip(os.path.sep)
-                                            tgt_path = os.path.normpath(os.path.join(tgt_root, rel))
-                                    except Exception:
-                                        rel = src_path.lstrip(os.path.sep)
-                                        tgt_path = os.path.normpath(os.path.join(tgt_root, rel))
-                                else:
-                                    # No target root known: attempt to copy to same absolute path
-                                    tgt_path = src_path
+                                os.remove(tmp)
                             except Exception:
-                                tgt_path = src_path
-
-                            # create parent directory
+                                pass
+                            if action == 'continue':
+                                return False
+                            try:
+                                self._cancelled = True
+                            except Exception:
+                                pass
+                            return False
+                        except OSError:
+                            # fallback to copy2 which also tries to copy metadata
                             try:
-                                tgt_dir = os.path.dirname(tgt_path)
-                                if tgt_dir and not os.path.exists(tgt_dir):
-                                    os.makedirs(tgt_dir, exist_ok=True)
-                            except PermissionError as e:
-                                # clearly handle permission errors on target
+                                shutil.copy2(src_path, tmp)
+                            except PermissionError as e2:
                                 try:
-                                    action = self._handle_error_and_wait(f"Permission denied creating target directory {tgt_dir}: {e}")
+                                    action = self._handle_error_and_wait(f"Permission denied copying {src_path} -> {tmp}: {e2}")
                                 except Exception:
                                     action = None
+                                try:
+                                    os.remove(tmp)
+                                except Exception:
+                                    pass
                                 if action == 'continue':
                                     return False
                                 try:
@@ -379,11 +874,15 @@ class TransferWorker(QtCore.QThread):
                                 except Exception:
                                     pass
                                 return False
-                            except OSError as e:
+                            except Exception as e2:
                                 try:
-                                    action = self._handle_error_and_wait(f"Failed to create target directory {tgt_dir}: {e}")
+                                    action = self._handle_error_and_wait(f"Failed to copy file {src_path} -> {tmp}: {e2}")
                                 except Exception:
                                     action = None
+                                try:
+                                    os.remove(tmp)
+                                except Exception:
+                                    pass
                                 if action == 'continue':
                                     return False
                                 try:
@@ -392,373 +891,271 @@ class TransferWorker(QtCore.QThread):
                                     pass
                                 return False
 
-                            # handle symlink
-                            if is_symlink_v:
-                                try:
-                                    # remove existing target if any
-                                    try:
-                                        if os.path.lexists(tgt_path):
-                                            os.remove(tgt_path)
-                                    except Exception:
-                                        pass
-                                    os.symlink(link_target, tgt_path)
-                                    # try to preserve ownership of the symlink itself if possible
-                                    try:
-                                        if hasattr(os, 'lchown') and uid is not None and gid is not None:
-                                            os.lchown(tgt_path, uid, gid)
-                                    except Exception:
-                                        pass
-                                    return True
-                                except PermissionError as e:
-                                    try:
-                                        action = self._handle_error_and_wait(f"Permission denied creating symlink {tgt_path}: {e}")
-                                    except Exception:
-                                        action = None
-                                    if action == 'continue':
-                                        return False
-                                    try:
-                                        self._cancelled = True
-                                    except Exception:
-                                        pass
-                                    return False
-                                except OSError as e:
-                                    try:
-                                        action = self._handle_error_and_wait(f"Failed to create symlink {tgt_path}: {e}")
-                                    except Exception:
-                                        action = None
-                                    if action == 'continue':
-                                        return False
-                                    try:
-                                        self._cancelled = True
-                                    except Exception:
-                                        pass
-                                    return False
+                        # copy permission bits and timestamps
+                        try:
+                            shutil.copystat(src_path, tmp, follow_symlinks=True)
+                        except Exception:
+                            pass
+
+                        # try to set ownership if possible
+                        try:
+                            if uid is not None and gid is not None:
+                                os.chown(tmp, uid, gid)
+                        except PermissionError:
+                            # non-fatal if not permitted
+                            pass
+                        except Exception:
+                            pass
 
-                            # handle directory
-                            if is_dir_v:
+                        # atomic replace into final location
+                        try:
+                            os.replace(tmp, base)
+                        except PermissionError as e:
+                            # likely permission denied on target dir
+                            try:
+                                action = self._handle_error_and_wait(f"Permission denied moving {tmp} -> {base}: {e}")
+                            except Exception:
+                                action = None
+                            try:
+                                os.remove(tmp)
+                            except Exception:
+                                pass
+                            if action == 'continue':
+                                return False
+                            try:
+                                self._cancelled = True
+                            except Exception:
+                                pass
+                            return False
+                        except OSError:
+                            # final fallback: try shutil.move
+                            try:
+                                shutil.move(tmp, base)
+                            except PermissionError as e2:
                                 try:
-                                    if not os.path.exists(tgt_path):
-                                        os.makedirs(tgt_path, exist_ok=True)
-                                    try:
-                                        os.chmod(tgt_path, mode or 0o755)
-                                    except Exception:
-                                        pass
-                                    try:
-                                        if uid is not None and gid is not None:
-                                            os.chown(tgt_path, uid, gid)
-                                    except Exception:
-                                        pass
-                                    return True
-                                except PermissionError as e:
-                                    try:
-                                        action = self._handle_error_and_wait(f"Permission denied creating directory {tgt_path}: {e}")
-                                    except Exception:
-                                        action = None
-                                    if action == 'continue':
-                                        return False
-                                    try:
-                                        self._cancelled = True
-                                    except Exception:
-                                        pass
-                                    return False
-                                except OSError as e:
-                                    try:
-                                        action = self._handle_error_and_wait(f"Failed to create directory {tgt_path}: {e}")
-                                    except Exception:
-                                        action = None
-                                    if action == 'continue':
-                                        return False
-                                    try:
-                                        self._cancelled = True
-                                    except Exception:
-                                        pass
+                                    action = self._handle_error_and_wait(f"Permission denied moving {tmp} -> {base}: {e2}")
+                                except Exception:
+                                    action = None
+                                try:
+                                    os.remove(tmp)
+                                except Exception:
+                                    pass
+                                if action == 'continue':
                                     return False
-
-                            # handle regular file copy
-                            if is_file_v:
-                                base = tgt_path
-                                tmp = base + f".tmp-transfer-{os.getpid()}-{int(time.time() * 1000)}"
-                                # ensure no stale tmp
                                 try:
-                                    if os.path.exists(tmp):
-                                        try:
-                                            os.remove(tmp)
-                                        except Exception:
-                                            pass
+                                    self._cancelled = True
                                 except Exception:
                                     pass
-
-                                # perform copy of file data and basic metadata
+                                return False
+                            except Exception as e2:
                                 try:
-                                    try:
-                                        shutil.copyfile(src_path, tmp)
-                                    except PermissionError as e:
-                                        try:
-                                            action = self._handle_error_and_wait(f"Permission denied copying {src_path} -> {tmp}: {e}")
-                                        except Exception:
-                                            action = None
-                                        try:
-                                            if os.path.exists(tmp):
-                                                os.remove(tmp)
-                                        except Exception:
-                                            pass
-                                        if action == 'continue':
-                                            return False
-                                        try:
-                                            self._cancelled = True
-                                        except Exception:
-                                            pass
-                                        return False
-                                    except OSError:
-                                        # fallback to copy2 which also tries to copy metadata
-                                        try:
-                                            shutil.copy2(src_path, tmp)
-                                        except PermissionError as e2:
-                                            try:
-                                                action = self._handle_error_and_wait(f"Permission denied copying {src_path} -> {tmp}: {e2}")
-                                            except Exception:
-                                                action = None
-                                            try:
-                                                if os.path.exists(tmp):
-                                                    os.remove(tmp)
-                                            except Exception:
-                                                pass
-                                            if action == 'continue':
-                                                return False
-                                            try:
-                                                self._cancelled = True
-                                            except Exception:
-                                                pass
-                                            return False
-                                        except Exception as e2:
-                                            try:
-                                                action = self._handle_error_and_wait(f"Failed to copy file {src_path} -> {tmp}: {e2}")
-                                            except Exception:
-                                                action = None
-                                            try:
-                                                if os.path.exists(tmp):
-                                                    os.remove(tmp)
-                                            except Exception:
-                                                pass
-                                            if action == 'continue':
-                                                return False
-                                            try:
-                                                self._cancelled = True
-                                            except Exception:
-                                                pass
-                                            return False
-
-                                    # copy permission bits and timestamps
-                                    try:
-                                        shutil.copystat(src_path, tmp, follow_symlinks=True)
-                                    except Exception:
-                                        pass
-
-                                    # try to set ownership if possible
-                                    try:
-                                        if uid is not None and gid is not None:
-                                            os.chown(tmp, uid, gid)
-                                    except PermissionError:
-                                        # non-fatal if not permitted
-                                        pass
-                                    except Exception:
-                                        pass
-
-                                    # atomic replace into final location
-                                    try:
-                                        os.replace(tmp, base)
-                                    except PermissionError as e:
-                                        # likely permission denied on target dir
-                                        try:
-                                            action = self._handle_error_and_wait(f"Permission denied moving {tmp} -> {base}: {e}")
-                                        except Exception:
-                                            action = None
-                                        try:
-                                            if os.path.exists(tmp):
-                                                os.remove(tmp)
-                                        except Exception:
-                                            pass
-                                        if action == 'continue':
-                                            return False
-                                        try:
-                                            self._cancelled = True
-                                        except Exception:
-                                            pass
-                                        return False
-                                    except OSError:
-                                        # final fallback: try shutil.move
-                                        try:
-                                            shutil.move(tmp, base)
-                                        except PermissionError as e2:
-                                            try:
-                                                action = self._handle_error_and_wait(f"Permission denied moving {tmp} -> {base}: {e2}")
-                                            except Exception:
-                                                action = None
-                                            try:
-                                                if os.path.exists(tmp):
-                                                    os.remove(tmp)
-                                            except Exception:
-                                                pass
-                                            if action == 'continue':
-                                                return False
-                                            try:
-                                                self._cancelled = True
-                                            except Exception:
-                                                pass
-                                            return False
-                                        except Exception as e2:
-                                            try:
-                                                action = self._handle_error_and_wait(f"Failed to move copied file into place {tmp} -> {base}: {e2}")
-                                            except Exception:
-                                                action = None
-                                            try:
-                                                if os.path.exists(tmp):
-                                                    os.remove(tmp)
-                                            except Exception:
-                                                pass
-                                            if action == 'continue':
-                                                return False
-                                            try:
-                                                self._cancelled = True
-                                            except Exception:
-                                                pass
-                                            return False
-
-                                    return True
-                                except Exception as e:
-                                    # Catch-all for unexpected exceptions; report and cleanup
-                                    try:
-                                        if os.path.exists(tmp):
-                                            os.remove(tmp)
-                                    except Exception:
-                                        pass
-                                    try:
-                                        action = self._handle_error_and_wait(f"Failed to copy file {src_path} -> {tgt_path}: {e}")
-                                    except Exception:
-                                        action = None
-                                    if action == 'continue':
-                                        return False
-                                    try:
-                                        self._cancelled = True
-                                    except Exception:
-                                        pass
+                                    action = self._handle_error_and_wait(f"Failed to move copied file into place {tmp} -> {base}: {e2}")
+                                except Exception:
+                                    action = None
+                                try:
+                                    os.remove(tmp)
+                                except Exception:
+                                    pass
+                                if action == 'continue':
                                     return False
-                            # unknown type: skip
-                            return False
+                                try:
+                                    self._cancelled = True
+                                except Exception:
+                                    pass
+                                return False
 
-                        # perform copy and skip DB update if copy fails
+                        return True
+                    except Exception as e:
+                        # Catch-all for unexpected exceptions; report and cleanup
                         try:
-                            copied_ok = _copy_item()
+                            os.remove(tmp)
                         except Exception:
-                            copied_ok = False
-                        if not copied_ok:
-                            # On failure, emit progress once. The copy helper has
-                            # already emitted an error and possibly set
-                            # self._cancelled depending on the user's decision.
-                            try:
-                                pct = int((idx + 1) * 100 / max(1, total))
-                                self.progress.emit(pct)
-                            except Exception:
-                                pass
-                            # if the user chose to abort, stop the transfer
-                            if getattr(self, '_cancelled', False):
-                                break
-                            # otherwise continue to next item
-                            continue
-
-                        # Check for existing target row by the new primary key (dirpath, name, scan_run_id)
-                        existing = None
+                            pass
                         try:
-                            tgt_cur.execute(
-                                "SELECT dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id FROM files WHERE dirpath = ? AND name = ? AND scan_run_id = ? LIMIT 1",
-                                (dirpath_s, name_s, self.run_tgt),
-                            )
-                            existing = tgt_cur.fetchone()
+                            action = self._handle_error_and_wait(f"Failed to copy file {src_path} -> {tgt_path}: {e}")
+                        except Exception:
+                            action = None
+                        if action == 'continue':
+                            return False
+                        try:
+                            self._cancelled = True
                         except Exception:
-                            existing = None
+                            pass
+                        return False
+                # unknown type: skip
+                return False
 
-                        # If an existing row is present, archive it into files_history before replacing
-                        if existing:
-                            try:
-                                tgt_cur.execute(
-                                    """
-                                    CREATE TABLE IF NOT EXISTS files_history (
-                                      dev_major INTEGER,
-                                      dev_minor INTEGER,
-                                      ino INTEGER,
-                                      dirpath TEXT,
-                                      name TEXT,
-                                      suffix TEXT,
-                                      mode INTEGER,
-                                      uid INTEGER,
-                                      gid INTEGER,
-                                      size INTEGER,
-                                      atime REAL,
-                                      mtime REAL,
-                                      ctime REAL,
-                                      is_dir INTEGER,
-                                      is_file INTEGER,
-                                      is_symlink INTEGER,
-                                      link_target TEXT,
-                                      transfer_id INTEGER,
-                                      content_hash_id INTEGER,
-                                      scan_run_id INTEGER,
-                                      drive_serial_id INTEGER
-                                    )
-                                    """
-                                )
-                                try:
-                                    tgt_cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS files_history_unique_dirname_transfer ON files_history(dirpath, name, transfer_id)")
-                                except Exception:
-                                    pass
-                                try:
-                                    tgt_cur.execute("CREATE INDEX IF NOT EXISTS idx_history_dirpath_name ON files_history(dirpath, name)")
-                                except Exception:
-                                    pass
-                                tgt_conn.commit()
-                            except Exception:
-                                pass
+            # files_history DDL is issued on the first archived row only
+            history_ready = False
 
-                            try:
-                                # insert the existing row into files_history but override transfer_id with current transfer_id
-                                tgt_cur.execute(
-                                    "INSERT OR IGNORE INTO files_history(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                    (
-                                        existing[0], existing[1], existing[2], existing[3], existing[4], existing[5], existing[6], existing[7], existing[8], existing[9], existing[10], existing[11], existing[12], existing[13], existing[14], existing[15], existing[16], transfer_id, existing[18], existing[19], existing[20]
-                                    ),
-                                )
-                                tgt_conn.commit()
-                            except Exception:
-                                pass
+            def record_item(r, tgt_ch_id, tgt_ds_id):
+                # write a copied item's row into the target run
+                nonlocal history_ready
+                (dev_major, dev_minor, ino, dirpath_s, name_s, suffix, mode, uid, gid, size, atime_v, mtime_v, ctime_v, is_dir_v, is_file_v, is_symlink_v, link_target, src_ch_id, src_ds_id) = r
 
-                        # Now insert/replace the new row into files for the target run
-                        try:
-                            tgt_cur.execute(
-                                "INSERT OR REPLACE INTO files(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                (dev_major, dev_minor, ino, dirpath_s, name_s, suffix, mode, uid, gid, size, atime_v, mtime_v, ctime_v, is_dir_v, is_file_v, is_symlink_v, link_target, transfer_id, tgt_ch_id, self.run_tgt, tgt_ds_id),
+                # Check for existing target row by the new primary key (dirpath, name, scan_run_id)
+                existing = None
+                try:
+                    tgt_cur.execute(
+                        "SELECT dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id, drive_serial_id FROM files WHERE dirpath = ? AND name = ? AND scan_run_id = ? LIMIT 1",
+                        (dirpath_s, name_s, self.run_tgt),
+                    )
+                    existing = tgt_cur.fetchone()
+                except Exception:
+                    existing = None
+
+                # If an existing row is present, archive it into files_history before replacing
+                if existing and not history_ready:
+                    history_ready = True
+                    try:
+                        tgt_cur.execute(
+                            """
+                            CREATE TABLE IF NOT EXISTS files_history (
+                              dev_major INTEGER,
+                              dev_minor INTEGER,
+                              ino INTEGER,
+                              dirpath TEXT,
+                              name TEXT,
+                              suffix TEXT,
+                              mode INTEGER,
+                              uid INTEGER,
+                              gid INTEGER,
+                              size INTEGER,
+                              atime REAL,
+                              mtime REAL,
+                              ctime REAL,
+                              is_dir INTEGER,
+                              is_file INTEGER,
+                              is_symlink INTEGER,
+                              link_target TEXT,
+                              transfer_id INTEGER,
+                              content_hash_id INTEGER,
+                              scan_run_id INTEGER,
+                              drive_serial_id INTEGER
                             )
-                            tgt_conn.commit()
-                            transferred += 1
+                            """
+                        )
+                        try:
+                            tgt_cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS files_history_unique_dirname_transfer ON files_history(dirpath, name, transfer_id)")
                         except Exception:
-                            try:
-                                # fallback without drive_serial_id if target schema lacks it
-                                tgt_cur.execute(
-                                    "INSERT OR REPLACE INTO files(dev_major, dev_minor, ino, dirpath, name, suffix, mode, uid, gid, size, atime, mtime, ctime, is_dir, is_file, is_symlink, link_target, transfer_id, content_hash_id, scan_run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                    (
-                                        dev_major, dev_minor, ino, dirpath_s, name_s, suffix, mode, uid, gid, size, atime_v, mtime_v, ctime_v, is_dir_v, is_file_v, is_symlink_v, link_target, transfer_id, tgt_ch_id, self.run_tgt,
-                                    ),
-                                )
-                                tgt_conn.commit()
-                                transferred += 1
-                            except Exception:
-                                pass
+                            pass
+                        try:
+                            tgt_cur.execute("CREATE INDEX IF NOT EXISTS idx_history_dirpath_name ON files_history(dirpath, name)")
+                        except Exception:
+                            pass
+                    except Exception:
+                        pass
+
+                if existing:
+                    # queue the existing row for files_history, tagged with the current transfer_id
+                    pending_history_rows.append(existing[:17] + (transfer_id,) + existing[18:])
+
+                # queue the new row for the target run; flush_files() writes it
+                row = (dev_major, dev_minor, ino, dirpath_s, name_s, suffix, mode, uid, gid, size, atime_v, mtime_v, ctime_v, is_dir_v, is_file_v, is_symlink_v, link_target, transfer_id, tgt_ch_id, self.run_tgt, tgt_ds_id)
+                pending_file_rows.append(row if use_ds else row[:-1])
+                if len(pending_file_rows) >= TRANSFER_COMMIT_EVERY:
+                    flush_files()
+
+            done = 0
+            # progress is only signalled when the percentage changes, file names
+            # at most every PROGRESS_EMIT_INTERVAL; the last name is sent at the end
+            self._last_pct = -1
+            self._last_emit_ts = 0.0
+            unsent_file = None
+
+            def item_done():
+                nonlocal done
+                done += 1
+                try:
+                    pct = int(done * 100 / max(1, total))
+                    if pct != self._last_pct:
+                        self._last_pct = pct
+                        self.progress.emit(pct)
                 except Exception:
                     pass
 
-                # emit progress
+            def emit_file(full):
+                nonlocal unsent_file
+                now = time.monotonic()
+                if now - self._last_emit_ts >= PROGRESS_EMIT_INTERVAL:
+                    self._last_emit_ts = now
+                    unsent_file = None
+                    self.file_progress.emit(full)
+                else:
+                    unsent_file = full
+
+            # copies run on a small pool; DB writes stay on this thread and are
+            # done oldest first so rows land in the same order as checked_files
+            inflight = collections.deque()
+
+            def finish_oldest():
+                r, tgt_ch_id, tgt_ds_id, fut = inflight.popleft()
+                if fut.cancelled():
+                    return
+                # skip the DB update if the copy failed; the copy helper has
+                # already emitted an error and possibly set self._cancelled
+                try:
+                    copied_ok = fut.result()
+                except Exception:
+                    copied_ok = False
+                if copied_ok:
+                    try:
+                        record_item(r, tgt_ch_id, tgt_ds_id)
+                    except Exception:
+                        pass
+                item_done()
+
+            pool = ThreadPoolExecutor(max_workers=TRANSFER_WORKERS)
+            try:
+                for idx, (dirpath, name) in enumerate(self.checked_files):
+                    # check cancellation flag between items
+                    if getattr(self, '_cancelled', False):
+                        break
+                    if idx % TRANSFER_PREFETCH_ROWS == 0:
+                        prefetch_rows(idx)
+                    try:
+                        if prefetch_ok:
+                            r = prefetched.get((dirpath, name))
+                        else:
+                            src_cur.execute(
+                                f"SELECT {file_cols} FROM files f WHERE scan_run_id = ? AND dirpath = ? AND name = ? LIMIT 1",
+                                (self.run_src, dirpath, name),
+                            )
+                            r = src_cur.fetchone()
+                        if not r:
+                            # skip missing
+                            item_done()
+                            continue
+                        tgt_ch_id = map_content_hash(r[17])
+                        tgt_ds_id = map_drive_serial(r[18])
+
+                        # Emit current filename being processed for UI
+                        try:
+                            emit_file(os.path.join(r[3], r[4]))
+                        except Exception:
+                            pass
+
+                        clone = find_clone_source(tgt_ch_id) if tgt_ch_id and r[14] else None
+                        fut = pool.submit(_copy_item, r[3], r[4], r[6], r[7], r[8], r[13], r[14], r[15], r[16], r[9], r[11], clone)
+                        inflight.append((r, tgt_ch_id, tgt_ds_id, fut))
+                    except Exception:
+                        item_done()
+                        continue
+                    while inflight and (inflight[0][3].done() or len(inflight) >= TRANSFER_WORKERS * 2):
+                        finish_oldest()
+                # on cancel, drop copies that haven't started; ones already
+                # running finish and are recorded
+                if getattr(self, '_cancelled', False):
+                    for item in inflight:
+                        item[3].cancel()
+                while inflight:
+                    finish_oldest()
+            finally:
+                pool.shutdown(wait=True)
+            flush_files()
+            if unsent_file is not None:
                 try:
-                    pct = int((idx + 1) * 100 / max(1, total))
-                    self.progress.emit(pct)
+                    self.file_progress.emit(unsent_file)
                 except Exception:
                     pass
 
@@ -789,6 +1186,12 @@ class TransferWorker(QtCore.QThread):
                 src_conn.close()
             except Exception:
                 pass
+            # keep rows from a partial batch if we bailed out early
+            try:
+                if tgt_conn.in_transaction:
+                    tgt_conn.commit()
+            except Exception:
+                pass
             try:
                 tgt_conn.close()
             except Exception:
@@ -815,16 +1218,26 @@ class CompareWorker(QtCore.QThread):
         self.run2 = run2
 
     def run(self):
+        # DB2 is attached to DB1's connection so run2's hashes move between
+        # them inside SQLite rather than through Python
         try:
             c1 = sqlite3.connect(self.db1)
-            c2 = sqlite3.connect(self.db2)
+            c1.execute("ATTACH DATABASE ? AS db2", (self.db2,))
         except Exception as e:
             self.error.emit(f"Failed to open DBs: {e}")
             return
 
+        # both DBs are only read here (plus temp tables), so they are left in
+        # their journal mode and unindexed; temp data stays in memory
+        for pragma in ("PRAGMA busy_timeout=5000", "PRAGMA temp_store=MEMORY",
+                       "PRAGMA main.cache_size=-65536", "PRAGMA db2.cache_size=-65536"):
+            try:
+                c1.execute(pragma)
+            except Exception:
+                pass
+
         try:
             cur1 = c1.cursor()
-            cur2 = c2.cursor()
 
             # totals
             try:
@@ -833,8 +1246,8 @@ class CompareWorker(QtCore.QThread):
             except Exception:
                 total1 = 0
             try:
-                cur2.execute("SELECT COUNT(*) FROM files WHERE scan_run_id = ?", (self.run2,))
-                total2 = cur2.fetchone()[0] or 0
+                cur1.execute("SELECT COUNT(*) FROM db2.files WHERE scan_run_id = ?", (self.run2,))
+                total2 = cur1.fetchone()[0] or 0
             except Exception:
                 total2 = 0
             # quick progress
@@ -843,7 +1256,7 @@ class CompareWorker(QtCore.QThread):
             except Exception:
                 pass
 
-            # create temp table in DB1 to hold hashes from DB2
+            # create temp table to hold hashes from DB2
             try:
                 c1.execute("CREATE TEMP TABLE IF NOT EXISTS temp_hashes(hash TEXT PRIMARY KEY)")
                 c1.commit()
@@ -855,64 +1268,86 @@ class CompareWorker(QtCore.QThread):
             except Exception:
                 pass
 
-            # gather distinct hashes from DB2 for run2
-            rows2 = []
+            # copy distinct hashes for run2 from DB2 into the temp table
             try:
-                cur2.execute(
-                    "SELECT DISTINCT ch.content_hash FROM files f JOIN content_hashes ch ON f.content_hash_id = ch.id WHERE f.scan_run_id = ? AND ch.content_hash IS NOT NULL",
+                cur1.execute(
+                    "INSERT OR IGNORE INTO temp_hashes(hash) SELECT DISTINCT ch.content_hash FROM db2.files f JOIN db2.content_hashes ch ON f.content_hash_id = ch.id WHERE f.scan_run_id = ? AND ch.content_hash IS NOT NULL",
                     (self.run2,)
                 )
-                rows2 = [r[0] for r in cur2.fetchall() if r and r[0]]
+                c1.commit()
             except Exception:
-                rows2 = []
-
-            # insert into temp table in DB1
+                pass
             try:
-                if rows2:
-                    insert_rows = [(h,) for h in rows2]
-                    c1.executemany("INSERT OR IGNORE INTO temp_hashes(hash) VALUES (?)", insert_rows)
-                    c1.commit()
+                self.progress.emit(60)
             except Exception:
                 pass
+
+            # collect run1's hashed files (rowid + hash id) into a temp table in
+            # one pass over files; the counts and the anti-join below read it
+            # instead of each scanning files for scan_run_id again
             try:
-                self.progress.emit(60)
+                c1.execute("CREATE TEMP TABLE IF NOT EXISTS temp_run1(file_id INTEGER, content_hash_id INTEGER)")
+                cur1.execute(
+                    "INSERT INTO temp_run1(file_id, content_hash_id) SELECT rowid, content_hash_id FROM files WHERE scan_run_id = ? AND content_hash_id IS NOT NULL",
+                    (self.run1,)
+                )
+                c1.commit()
             except Exception:
                 pass
+            try:
+                cur1.execute("SELECT COUNT(*) FROM temp_run1")
+                files_with_hash_run1 = cur1.fetchone()[0] or 0
+            except Exception:
+                files_with_hash_run1 = 0
 
             # Now query DB1 for files in run1 whose content_hash is NOT present in temp_hashes
+            # (anti-join: each hash is a single primary-key probe into temp_hashes).
+            # Rows come back as (dirpath, name, hash), the shape the tree view
+            # uses, and are fetched in batches so progress moves 60 -> 90
             missing_rows = []
             try:
                 cur1.execute(
-                    "SELECT ch.content_hash, f.dirpath, f.name FROM files f JOIN content_hashes ch ON f.content_hash_id = ch.id WHERE f.scan_run_id = ? AND ch.content_hash IS NOT NULL AND ch.content_hash NOT IN (SELECT hash FROM temp_hashes)",
-                    (self.run1,)
+                    "SELECT f.dirpath, f.name, ch.content_hash FROM temp_run1 r JOIN content_hashes ch ON ch.id = r.content_hash_id LEFT JOIN temp_hashes th ON th.hash = ch.content_hash JOIN files f ON f.rowid = r.file_id WHERE ch.content_hash IS NOT NULL AND th.hash IS NULL"
                 )
-                missing_rows = cur1.fetchall()
+                while True:
+                    chunk = cur1.fetchmany(COMPARE_FETCH_ROWS)
+                    if not chunk:
+                        break
+                    missing_rows.extend(chunk)
+                    try:
+                        self.progress.emit(60 + 30 * len(missing_rows) // max(1, files_with_hash_run1))
+                    except Exception:
+                        pass
             except Exception:
                 missing_rows = []
 
-            # compute counts
+            # compute counts (distinct hashes per run and their overlap) in SQL
             try:
                 cur1.execute(
-                    "SELECT DISTINCT ch.content_hash FROM files f JOIN content_hashes ch ON f.content_hash_id = ch.id WHERE f.scan_run_id = ? AND ch.content_hash IS NOT NULL",
-                    (self.run1,)
+                    "SELECT COUNT(DISTINCT ch.content_hash) FROM temp_run1 r JOIN content_hashes ch ON ch.id = r.content_hash_id WHERE ch.content_hash IS NOT NULL"
                 )
-                rows1_hashes = [r[0] for r in cur1.fetchall() if r and r[0]]
+                set1_count = cur1.fetchone()[0] or 0
             except Exception:
-                rows1_hashes = []
-            set1 = set(rows1_hashes)
-            set2 = set(rows2)
-            common_hashes = set1 & set2
+                set1_count = 0
             try:
-                cur1.execute("SELECT COUNT(*) FROM files f WHERE f.scan_run_id = ? AND f.content_hash_id IS NOT NULL", (self.run1,))
-                files_with_hash_run1 = cur1.fetchone()[0] or 0
+                cur1.execute("SELECT COUNT(*) FROM temp_hashes")
+                set2_count = cur1.fetchone()[0] or 0
             except Exception:
-                files_with_hash_run1 = 0
+                set2_count = 0
+            try:
+                cur1.execute(
+                    "SELECT COUNT(DISTINCT ch.content_hash) FROM temp_run1 r JOIN content_hashes ch ON ch.id = r.content_hash_id JOIN temp_hashes th ON th.hash = ch.content_hash"
+                )
+                common_hashes = cur1.fetchone()[0] or 0
+            except Exception:
+                common_hashes = 0
             diff_hash_files = len(missing_rows)
             same_hash_files = files_with_hash_run1 - diff_hash_files
 
-            # cleanup temp table
+            # cleanup temp tables
             try:
                 c1.execute("DROP TABLE IF EXISTS temp_hashes")
+                c1.execute("DROP TABLE IF EXISTS temp_run1")
                 c1.commit()
             except Exception:
                 pass
@@ -926,9 +1361,9 @@ class CompareWorker(QtCore.QThread):
             result = {
                 'total1': total1,
                 'total2': total2,
-                'set1_count': len(set1),
-                'set2_count': len(set2),
-                'common_hashes': len(common_hashes),
+                'set1_count': set1_count,
+                'set2_count': set2_count,
+                'common_hashes': common_hashes,
                 'files_with_hash_run1': files_with_hash_run1,
                 'same_hash_files': same_hash_files,
                 'diff_hash_files': diff_hash_files,
@@ -943,10 +1378,6 @@ class CompareWorker(QtCore.QThread):
                 c1.close()
             except Exception:
                 pass
-            try:
-                c2.close()
-            except Exception:
-                pass
 
 
 
@@ -961,10 +1392,14 @@ class FSCompareGUI(QtWidgets.QMainWindow):
         self.setCentralWidget(central)
         layout = QtWidgets.QVBoxLayout(central)
 
-        # timer to hit python event loop periodically
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(lambda: None)
-        self.timer.start(200)
+        # text for the output panes is buffered and written in one insert per
+        # timer tick, so bursts of output don't re-layout the view per line
+        self._output_buffers = {}
+        self._output_decoders = {}
+        self._output_flush_timer = QtCore.QTimer(self)
+        self._output_flush_timer.setSingleShot(True)
+        self._output_flush_timer.setInterval(50)
+        self._output_flush_timer.timeout.connect(self._flush_output)
 
         # Help / About menu
         try:
@@ -997,11 +1432,12 @@ class FSCompareGUI(QtWidgets.QMainWindow):
             script_dir = os.path.dirname(os.path.abspath(__file__))
             images1_dir = os.path.join(script_dir, 'images1')
             if os.path.isdir(images1_dir):
-                candidates = [os.path.join(images1_dir, fn) for fn in os.listdir(images1_dir)
-                              if fn.lower().endswith('.jpg') or fn.lower().endswith('.jpeg')]
+                with os.scandir(images1_dir) as it:
+                    candidates = [e.path for e in it
+                                  if e.name.lower().endswith(('.jpg', '.jpeg')) and e.is_file()]
                 if candidates:
                     chosen = random.choice(candidates)
-                    pm = QtGui.QPixmap(chosen)
+                    pm = self._load_background_pixmap(chosen)
                     if not pm.isNull():
                         self.bg_pixmap = pm
                         self.centralWidget().setAutoFillBackground(True)
@@ -1283,6 +1719,7 @@ QGroupBox#scanOutputGroup QPlainTextEdit {
                 pass
             self.scan_output = QtWidgets.QPlainTextEdit()
             self.scan_output.setReadOnly(True)
+            self.scan_output.setMaximumBlockCount(OUTPUT_MAX_BLOCKS)
             output_layout.addWidget(self.scan_output)
             output_group.setLayout(output_layout)
 
@@ -1296,11 +1733,12 @@ QGroupBox#scanOutputGroup QPlainTextEdit {
                 images2_dir = os.path.join(script_dir, 'images2')
                 pm2 = None
                 if os.path.isdir(images2_dir):
-                    candidates2 = [os.path.join(images2_dir, fn) for fn in os.listdir(images2_dir)
-                                   if fn.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                    with os.scandir(images2_dir) as it:
+                        candidates2 = [e.path for e in it
+                                       if e.name.lower().endswith(('.jpg', '.jpeg', '.png')) and e.is_file()]
                     if candidates2:
                         chosen2 = random.choice(candidates2)
-                        pm_temp = QtGui.QPixmap(chosen2)
+                        pm_temp = self._load_background_pixmap(chosen2)
                         if not pm_temp.isNull():
                             pm2 = pm_temp
                 if pm2:
@@ -1376,6 +1814,7 @@ QGroupBox#scanOutputGroup QPlainTextEdit {
             resume_output_layout = QtWidgets.QVBoxLayout(resume_output_group)
             self.resume_output = QtWidgets.QPlainTextEdit()
             self.resume_output.setReadOnly(True)
+            self.resume_output.setMaximumBlockCount(OUTPUT_MAX_BLOCKS)
             resume_output_layout.addWidget(self.resume_output)
             resume_output_group.setLayout(resume_output_layout)
 
@@ -1405,11 +1844,12 @@ QGroupBox#resumeOutputGroup {
                 images4_dir = os.path.join(script_dir, 'images4')
                 pm4 = None
                 if os.path.isdir(images4_dir):
-                    candidates4 = [os.path.join(images4_dir, fn) for fn in os.listdir(images4_dir)
-                                   if fn.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                    with os.scandir(images4_dir) as it:
+                        candidates4 = [e.path for e in it
+                                       if e.name.lower().endswith(('.jpg', '.jpeg', '.png')) and e.is_file()]
                     if candidates4:
                         chosen4 = random.choice(candidates4)
-                        pm_temp4 = QtGui.QPixmap(chosen4)
+                        pm_temp4 = self._load_background_pixmap(chosen4)
                         if not pm_temp4.isNull():
                             pm4 = pm_temp4
                 if pm4:
@@ -1526,6 +1966,7 @@ QGroupBox#resumeOutputGroup {
             hardlink_output_layout = QtWidgets.QVBoxLayout(hardlink_output_group)
             self.hardlink_output = QtWidgets.QPlainTextEdit()
             self.hardlink_output.setReadOnly(True)
+            self.hardlink_output.setMaximumBlockCount(OUTPUT_MAX_BLOCKS)
             hardlink_output_layout.addWidget(self.hardlink_output)
             hardlink_output_group.setLayout(hardlink_output_layout)
 
@@ -1555,11 +1996,12 @@ QGroupBox#hardlinkOutputGroup {
                 images3_dir = os.path.join(script_dir, 'images3')
                 pm3 = None
                 if os.path.isdir(images3_dir):
-                    candidates3 = [os.path.join(images3_dir, fn) for fn in os.listdir(images3_dir)
-                                   if fn.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                    with os.scandir(images3_dir) as it:
+                        candidates3 = [e.path for e in it
+                                       if e.name.lower().endswith(('.jpg', '.jpeg', '.png')) and e.is_file()]
                     if candidates3:
                         chosen3 = random.choice(candidates3)
-                        pm_temp3 = QtGui.QPixmap(chosen3)
+                        pm_temp3 = self._load_background_pixmap(chosen3)
                         if not pm_temp3.isNull():
                             pm3 = pm_temp3
                 if pm3:
@@ -1862,6 +2304,10 @@ QGroupBox#hardlinkOutputGroup {
         # helps avoid native crashes where a QThread may still emit signals
         # while Qt objects are being torn down.
         try:
+            # fscan child processes: interrupt them so they save resumable state,
+            # rather than being killed outright when their QProcess is destroyed
+            self._stop_processes()
+
             # Transfer worker
             tw = getattr(self, '_transfer_worker', None)
             if tw is not None:
@@ -2021,11 +2467,9 @@ QGroupBox#hardlinkOutputGroup {
             diff_hash_files = result.get('diff_hash_files', 0)
             missing_rows = result.get('missing_rows', [])
 
-            # store last_missing_rows for tree display: include dirpath,name,hash
-            try:
-                self.last_missing_rows = [(d, n, h) for (h, d, n) in missing_rows]
-            except Exception:
-                self.last_missing_rows = []
+            # store last_missing_rows for tree display: (dirpath, name, hash)
+            # rows as produced by the worker; kept as-is rather than copied
+            self.last_missing_rows = missing_rows if isinstance(missing_rows, list) else []
 
             # update results label
             try:
@@ -2453,10 +2897,6 @@ QGroupBox#hardlinkOutputGroup {
                         action = 'abort'
                     # inform worker of the user's decision
                     if getattr(self, '_transfer_worker', None) is not None:
-                        try:
-                            self._transfer_worker._error_action = action
-                        except Exception:
-                            pass
                         try:
                             # if user chose to continue, ensure worker.cancelled is False
                             if action == 'continue':
@@ -2472,8 +2912,7 @@ QGroupBox#hardlinkOutputGroup {
                         except Exception:
                             pass
                         try:
-                            if getattr(self._transfer_worker, '_error_action_event', None) is not None:
-                                self._transfer_worker._error_action_event.set()
+                            self._transfer_worker.set_error_action(action)
                         except Exception:
                             pass
                 except Exception:
@@ -2502,12 +2941,7 @@ QGroupBox#hardlinkOutputGroup {
                 try:
                     if getattr(self, '_transfer_worker', None) is not None:
                         try:
-                            self._transfer_worker._error_action = 'continue'
-                        except Exception:
-                            pass
-                        try:
-                            if getattr(self._transfer_worker, '_error_action_event', None) is not None:
-                                self._transfer_worker._error_action_event.set()
+                            self._transfer_worker.set_error_action('continue')
                         except Exception:
                             pass
                 except Exception:
@@ -2688,6 +3122,29 @@ QGroupBox#hardlinkOutputGroup {
             pass
         return super().resizeEvent(event)
 
+    def _load_background_pixmap(self, path):
+        """Load a background image decoded at no more than screen size.
+
+        Backgrounds are only ever scaled down to cover a widget, so decoding
+        beyond the screen (which bounds the window) just costs memory and
+        startup time; JPEG decoders can downscale while decoding.
+        """
+        try:
+            reader = QtGui.QImageReader(path)
+            size = reader.size()
+            screen = QtGui.QGuiApplication.primaryScreen()
+            if screen is not None and size.isValid():
+                bound = screen.size() * screen.devicePixelRatio()
+                if size.width() > bound.width() and size.height() > bound.height():
+                    size.scale(bound, QtCore.Qt.KeepAspectRatioByExpanding)
+                    reader.setScaledSize(size)
+            img = reader.read()
+            if not img.isNull():
+                return QtGui.QPixmap.fromImage(img)
+        except Exception:
+            pass
+        return QtGui.QPixmap(path)
+
     def _apply_background_to_widget(self, widget, pix):
         """Apply a centered, scaled background pixmap to a specific widget."""
         try:
@@ -3050,17 +3507,50 @@ QGroupBox#hardlinkOutputGroup {
         except Exception:
             pass
 
-    def _append_hardlink_output(self, text):
+    def _queue_output(self, name, text):
+        # buffer text (str, or raw process bytes decoded at flush time) for the
+        # output pane attribute `name`; see _flush_output
         try:
-            self.hardlink_output.moveCursor(QtGui.QTextCursor.End)
-            self.hardlink_output.insertPlainText(text)
-            self.hardlink_output.moveCursor(QtGui.QTextCursor.End)
+            self._output_buffers.setdefault(name, []).append(text)
+            if not self._output_flush_timer.isActive():
+                self._output_flush_timer.start()
         except Exception:
+            pass
+
+    def _flush_output(self):
+        buffers, self._output_buffers = self._output_buffers, {}
+        for name, parts in buffers.items():
+            widget = getattr(self, name, None)
+            if widget is None:
+                continue
             try:
-                cur = self.hardlink_output.toPlainText()
-                self.hardlink_output.setPlainText(cur + text)
+                text = self._decode_output(name, parts)
             except Exception:
-                pass
+                continue
+            try:
+                widget.moveCursor(QtGui.QTextCursor.End)
+                widget.insertPlainText(text)
+                widget.moveCursor(QtGui.QTextCursor.End)
+            except Exception:
+                try:
+                    # fallback: append as a new block rather than re-setting the whole document
+                    widget.appendPlainText(text.rstrip('\n'))
+                except Exception:
+                    pass
+
+    def _decode_output(self, name, parts):
+        # one incremental decoder per pane keeps UTF-8 sequences that were
+        # split across process reads intact
+        decoder = self._output_decoders.get(name)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            self._output_decoders[name] = decoder
+        if all(isinstance(p, bytes) for p in parts):
+            return decoder.decode(b''.join(parts))
+        return ''.join(decoder.decode(p) if isinstance(p, bytes) else p for p in parts)
+
+    def _append_hardlink_output(self, text):
+        self._queue_output('hardlink_output', text)
 
     def _on_run_hardlink(self):
         # Confirm destructive operation then deduplicate by creating hardlinks.
@@ -3094,6 +3584,7 @@ QGroupBox#hardlinkOutputGroup {
             except Exception:
                 pass
 
+            self._flush_output()
             self.hardlink_output.clear()
             self._append_hardlink_output(f"Starting hardlink dedupe for run id={run_id}\n")
 
@@ -3191,27 +3682,24 @@ QGroupBox#hardlinkOutputGroup {
                         tmp = dup_path + f".tmp_hl.{os.getpid()}"
                         try:
                             # remove any leftover tmp
-                            if os.path.exists(tmp):
-                                try:
-                                    os.remove(tmp)
-                                except Exception:
-                                    pass
+                            try:
+                                os.remove(tmp)
+                            except OSError:
+                                pass
                             os.link(first_path, tmp)
                             os.replace(tmp, dup_path)
                         except OSError as oe:
                             # cross-device or permission errors
                             self._append_hardlink_output(f"    Failed to hardlink {dup_path}: {oe}\n")
                             try:
-                                if os.path.exists(tmp):
-                                    os.remove(tmp)
+                                os.remove(tmp)
                             except Exception:
                                 pass
                             continue
                         except Exception as e:
                             self._append_hardlink_output(f"    Error creating hardlink for {dup_path}: {e}\n")
                             try:
-                                if os.path.exists(tmp):
-                                    os.remove(tmp)
+                                os.remove(tmp)
                             except Exception:
                                 pass
                             continue
@@ -3309,6 +3797,7 @@ QGroupBox#hardlinkOutputGroup {
             except Exception:
                 pass
 
+            self._flush_output()
             self.hardlink_output.clear()
             self._append_hardlink_output(f"Dry run: listing hardlink candidates for run id={run_id}\n")
 
@@ -3530,30 +4019,10 @@ QGroupBox#hardlinkOutputGroup {
     # (resume controls removed) no-op placeholder kept for compatibility
 
     def _append_scan_output(self, text):
-        try:
-            # ensure UI updates happen in main thread
-            self.scan_output.moveCursor(QtGui.QTextCursor.End)
-            self.scan_output.insertPlainText(text)
-            self.scan_output.moveCursor(QtGui.QTextCursor.End)
-        except Exception:
-            try:
-                # fallback: append as simple text
-                cur = self.scan_output.toPlainText()
-                self.scan_output.setPlainText(cur + text)
-            except Exception:
-                pass
+        self._queue_output('scan_output', text)
 
     def _append_resume_output(self, text):
-        try:
-            self.resume_output.moveCursor(QtGui.QTextCursor.End)
-            self.resume_output.insertPlainText(text)
-            self.resume_output.moveCursor(QtGui.QTextCursor.End)
-        except Exception:
-            try:
-                cur = self.resume_output.toPlainText()
-                self.resume_output.setPlainText(cur + text)
-            except Exception:
-                pass
+        self._queue_output('resume_output', text)
 
     def _on_run_scan(self):
         try:
@@ -3643,6 +4112,7 @@ QGroupBox#hardlinkOutputGroup {
                 self.scan_process.readyReadStandardOutput.connect(self._on_scan_stdout)
                 self.scan_process.finished.connect(self._on_scan_finished)
                 # start
+                self._flush_output()
                 self.scan_output.clear()
                 self.scan_output.appendPlainText('Starting: ' + start_cmd + '\n')
                 # QProcess expects program and args separately
@@ -3747,6 +4217,7 @@ QGroupBox#hardlinkOutputGroup {
                 self.resume_process.setProcessChannelMode(QtCore.QProcess.MergedChannels)
                 self.resume_process.readyReadStandardOutput.connect(self._on_resume_stdout)
                 self.resume_process.finished.connect(self._on_resume_finished)
+                self._flush_output()
                 self.resume_output.clear()
                 self.resume_output.appendPlainText('Starting: ' + start_cmd + '\n')
                 self.resume_process.start(prog, prog_args)
@@ -3765,11 +4236,8 @@ QGroupBox#hardlinkOutputGroup {
         try:
             if not getattr(self, 'resume_process', None):
                 return
-            ba = self.resume_process.readAllStandardOutput()
-            try:
-                s = bytes(ba).decode('utf-8', errors='replace')
-            except Exception:
-                s = str(ba)
+            # keep the raw bytes; they are decoded once per flush of the pane
+            s = bytes(self.resume_process.readAllStandardOutput())
             self._append_resume_output(s)
         except Exception:
             pass
@@ -3835,51 +4303,20 @@ QGroupBox#hardlinkOutputGroup {
         try:
             self.resume_run_btn.setEnabled(True)
             self.resume_cancel_btn.setEnabled(False)
+            self._flush_output()
             self.resume_output.appendPlainText(f'Process finished with exit code {exitCode}\n')
         except Exception:
             pass
 
     def _on_cancel_resume(self):
-        try:
-            if getattr(self, 'resume_process', None) is None:
-                return
-            try:
-                proc = self.resume_process
-                pid = None
-                try:
-                    if callable(getattr(proc, 'processId', None)):
-                        pid = proc.processId()
-                    else:
-                        pid = getattr(proc, 'processId', None) or getattr(proc, 'pid', None)
-                except Exception:
-                    pid = None
-                try:
-                    if pid:
-                        os.kill(int(pid), signal.SIGINT)
-                        proc.waitForFinished(5000)
-                    else:
-                        proc.terminate()
-                        if not proc.waitForFinished(2000):
-                            proc.kill()
-                except Exception:
-                    try:
-                        proc.kill()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-        except Exception:
-            pass
+        self._interrupt_process(getattr(self, 'resume_process', None))
 
     def _on_scan_stdout(self):
         try:
             if not getattr(self, 'scan_process', None):
                 return
-            ba = self.scan_process.readAllStandardOutput()
-            try:
-                s = bytes(ba).decode('utf-8', errors='replace')
-            except Exception:
-                s = str(ba)
+            # keep the raw bytes; they are decoded once per flush of the pane
+            s = bytes(self.scan_process.readAllStandardOutput())
             # If there is an active DB-alter progress dialog, close it when output starts
             try:
                 dlg = getattr(self, '_db_alter_dialog', None)
@@ -3906,40 +4343,46 @@ QGroupBox#hardlinkOutputGroup {
         try:
             self.scan_run_btn.setEnabled(True)
             self.scan_cancel_btn.setEnabled(False)
+            self._flush_output()
             self.scan_output.appendPlainText(f'Process finished with exit code {exitCode}\n')
         except Exception:
             pass
 
     def _on_cancel_scan(self):
+        self._interrupt_process(getattr(self, 'scan_process', None))
+
+    def _stop_processes(self):
+        # interrupt any running fscan children so they save resumable state
+        for proc in (getattr(self, 'scan_process', None), getattr(self, 'resume_process', None)):
+            self._interrupt_process(proc)
+
+    def _interrupt_process(self, proc):
+        """Send SIGINT to an fscan QProcess (like Ctrl+C) and wait for it to exit."""
+        if proc is None:
+            return
         try:
-            if getattr(self, 'scan_process', None) is None:
-                return
+            pid = None
             try:
-                proc = self.scan_process
+                if callable(getattr(proc, 'processId', None)):
+                    pid = proc.processId()
+                else:
+                    pid = getattr(proc, 'processId', None) or getattr(proc, 'pid', None)
+            except Exception:
                 pid = None
-                try:
-                    if callable(getattr(proc, 'processId', None)):
-                        pid = proc.processId()
-                    else:
-                        pid = getattr(proc, 'processId', None) or getattr(proc, 'pid', None)
-                except Exception:
-                    pid = None
-                try:
-                    if pid:
-                        os.kill(int(pid), signal.SIGINT)
-                        # allow several seconds for fscan to save state
-                        proc.waitForFinished(5000)
-                    else:
-                        proc.terminate()
-                        if not proc.waitForFinished(2000):
-                            proc.kill()
-                except Exception:
-                    try:
+            try:
+                if pid:
+                    os.kill(int(pid), signal.SIGINT)
+                    # allow several seconds for fscan to save state
+                    proc.waitForFinished(5000)
+                else:
+                    proc.terminate()
+                    if not proc.waitForFinished(2000):
                         proc.kill()
-                    except Exception:
-                        pass
             except Exception:
-                pass
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
         except Exception:
             pass
 
@@ -3973,46 +4416,11 @@ def main():
         except Exception:
             pass
         try:
-            # If there is a running scan or resume process, try to terminate it first so it can
+            # If there is a running scan or resume process, interrupt it first so it can
             # perform its own graceful shutdown (fscan.py will save state on SIGINT/SIGTERM).
+            # 'w' is not bound yet if the signal arrives during startup.
             try:
-                # 'w' may not yet be defined; guard access
-                if 'w' in globals() and w is not None:
-                    try:
-                        proc = getattr(w, 'scan_process', None)
-                        if proc is None:
-                            proc = getattr(w, 'resume_process', None)
-                            if proc is not None:
-                                try:
-                                    # Try to send SIGINT to mimic Ctrl+C so the child can perform
-                                    # its graceful shutdown and save state.
-                                    pid = None
-                                    try:
-                                        # PyQt5/PySide6 provide processId() in newer versions
-                                        if callable(getattr(proc, 'processId', None)):
-                                            pid = proc.processId()
-                                        else:
-                                            pid = getattr(proc, 'processId', None) or getattr(proc, 'pid', None)
-                                    except Exception:
-                                        pid = None
-                                    try:
-                                        if pid:
-                                            os.kill(int(pid), signal.SIGINT)
-                                            # give the child several seconds to flush and save state
-                                            proc.waitForFinished(5000)
-                                        else:
-                                            # fallback to QProcess.terminate()
-                                            proc.terminate()
-                                            proc.waitForFinished(2000)
-                                    except Exception:
-                                        try:
-                                            proc.kill()
-                                        except Exception:
-                                            pass
-                                except Exception:
-                                    pass
-                    except Exception:
-                        pass
+                w._stop_processes()
             except Exception:
                 pass
             app.quit()
@@ -4031,6 +4439,27 @@ def main():
     except Exception:
         pass
 
+    # Wake the Qt event loop through a pipe when a signal arrives so the Python
+    # handler runs immediately, without a polling timer keeping the CPU busy.
+    _wakeup_notifier = None
+    try:
+        _wakeup_r, _wakeup_w = os.pipe()
+        os.set_blocking(_wakeup_r, False)
+        os.set_blocking(_wakeup_w, False)
+        signal.set_wakeup_fd(_wakeup_w)
+
+        def _drain_wakeup_fd():
+            try:
+                while os.read(_wakeup_r, 512):
+                    pass
+            except Exception:
+                pass
+
+        _wakeup_notifier = QtCore.QSocketNotifier(_wakeup_r, QtCore.QSocketNotifier.Read)
+        _wakeup_notifier.activated.connect(_drain_wakeup_fd)
+    except Exception:
+        _wakeup_notifier = None
+
     def _acquire_instance_lock():
         try:
             dh = os.path.join(os.path.expanduser('~'), '.filesage')
@@ -4153,6 +4582,10 @@ def main():
         w.show()
         ret = app.exec_()
     finally:
+        try:
+            signal.set_wakeup_fd(-1)
+        except Exception:
+            pass
         try:
             # release lock by closing file (OS releases flock on close)
             _lock_file.close()
@@ -20,3 +20,13 @@ def test_parse_args_resume_allows_no_root():
     ns = fscan.parse_args(['--resume', '7'])
     assert ns.resume == 7
     assert getattr(ns, 'root', None) is None
+
+
+def test_parse_args_unsafe_sync_defaults_off():
+    assert fscan.parse_args(['/data']).unsafe_sync is False
+    assert fscan.parse_args(['--unsafe-sync', '/data']).unsafe_sync is True
+
+
+def test_parse_args_hash_algo_defaults_to_sha256():
+    assert fscan.parse_args(['-H', '/data']).hash_algo == 'sha256'
+    assert fscan.parse_args(['-H', '--hash-algo', 'xxh3', '/data']).hash_algo == 'xxh3'
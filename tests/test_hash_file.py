@@ -0,0 +1,22 @@
+import hashlib
+
+import fscan
+
+
+def _write(tmp_path, data):
+    p = tmp_path / 'f.bin'
+    p.write_bytes(data)
+    return str(p)
+
+
+def test_hash_file_matches_sha256(tmp_path):
+    data = bytes(range(256)) * 9000
+    assert fscan.hash_file(_write(tmp_path, data)) == hashlib.sha256(data).hexdigest()
+
+
+def test_hash_file_fallback_without_file_digest(tmp_path, monkeypatch):
+    # larger than the 1 MiB read buffer so the loop runs more than once
+    data = b'x' * ((1 << 20) + 123)
+    monkeypatch.delattr(hashlib, 'file_digest', raising=False)
+    assert fscan.hash_file(_write(tmp_path, data)) == hashlib.sha256(data).hexdigest()
+    assert fscan.hash_file(_write(tmp_path, b'')) == hashlib.sha256(b'').hexdigest()
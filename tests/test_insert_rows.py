@@ -0,0 +1,24 @@
+import sqlite3
+
+import fscan
+
+
+def _rows(n, size):
+    return [(8, 1, i, '/d', 'f%d' % i, None, 33188, 0, 0, size, 1.5, 2.5, 3.5, 0, 1, 0, None, None, None, 1, None)
+            for i in range(n)]
+
+
+def test_insert_rows_matches_executemany():
+    n = fscan.INSERT_ROWS_PER_STMT * 2 + 7
+    a = sqlite3.connect(':memory:')
+    b = sqlite3.connect(':memory:')
+    for conn in (a, b):
+        conn.executescript(fscan.SCHEMA)
+    fscan._insert_rows(a.cursor(), _rows(n, 1))
+    # second pass goes through the upsert path
+    fscan._insert_rows(a.cursor(), _rows(n, 2))
+    b.executemany(fscan.INSERT_UPSERT, _rows(n, 1))
+    b.executemany(fscan.INSERT_UPSERT, _rows(n, 2))
+    q = "SELECT * FROM files ORDER BY name"
+    assert a.execute(q).fetchall() == b.execute(q).fetchall()
+    assert a.execute("SELECT COUNT(*), MIN(size) FROM files").fetchone() == (n, 2)
@@ -0,0 +1,32 @@
+import json
+import sqlite3
+
+import fscan
+
+
+def _conn():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(fscan.SCHEMA)
+    return conn
+
+
+def test_scan_state_round_trip():
+    conn = _conn()
+    queue = ['/data/a', '/data/with space', '/data/[brackets]', '/data/é\nnewline']
+    fscan.save_scan_state(conn, 3, queue, 17, '/data/a/x')
+    assert fscan.load_scan_state(conn, 3) == (queue, 17, '/data/a/x')
+
+
+def test_scan_state_empty_queue():
+    conn = _conn()
+    fscan.save_scan_state(conn, 4, [], 0, None)
+    assert fscan.load_scan_state(conn, 4) == ([], 0, None)
+
+
+def test_scan_state_reads_legacy_json_queue():
+    conn = _conn()
+    conn.execute(
+        "INSERT INTO scan_run_state(scan_run_id, queue, processed, last_path, saved_at) VALUES (?, ?, ?, ?, ?)",
+        (5, json.dumps(['/old/a', '/old/b']), 2, '/old/a', 0),
+    )
+    assert fscan.load_scan_state(conn, 5) == (['/old/a', '/old/b'], 2, '/old/a')
@@ -0,0 +1,46 @@
+import fscan
+
+
+def test_skip_prefix_matches_whole_components():
+    # root under /mnt: /mnt itself is allowed, the other skip dirs apply
+    assert not fscan.is_skipped_path('/mnt/backup/data', True, False)
+    assert fscan.is_skipped_path('/tmp', True, False)
+    assert fscan.is_skipped_path('/proc/self/fd', True, False)
+    assert not fscan.is_skipped_path('/procedures', True, False)
+
+
+def test_skip_prefixes_match_is_skipped_path():
+    for allow_mnt, allow_media in ((False, False), (True, False), (False, True)):
+        prefixes = fscan.skip_prefixes(allow_mnt, allow_media)
+        for path in ('/tmp/a', '/mnt/x', '/run', '/home/u/file', '/swap.img'):
+            assert (path + '/').startswith(prefixes) == fscan.is_skipped_path(path, allow_mnt, allow_media)
+
+
+def test_rel_skip_matches_component_sequences():
+    root = '/home/u'
+    assert fscan.is_rel_skipped('/home/u/.cache/mozilla/firefox', root)
+    assert fscan.is_rel_skipped('/home/u/x/flatpak/runtime/y', root)
+    assert not fscan.is_rel_skipped('/home/u/flatpak/runtimes', root)
+    assert not fscan.is_rel_skipped('/home/u', root)
+
+
+def test_rel_skip_fast_agrees_with_is_rel_skipped():
+    for root in ('/home/u', '/'):
+        n = len(root.rstrip('/') + '/')
+        for path in ('/home/u', '/home/u/.cache/opera/x', '/home/u/flatpak/runtimes', '/flatpak/runtime'):
+            if path.startswith(root):
+                assert fscan.is_rel_skipped_fast(path, n) == fscan.is_rel_skipped(path, root)
+
+
+def test_skip_pattern_agrees_with_separate_checks():
+    paths = ('/tmp/a', '/proc', '/procedures', '/mnt/u/.cache/opera/x', '/mnt/u/flatpak/runtimes',
+             '/mnt/u/a\nb/flatpak/runtime/c', '/mnt/u', '/home/u/.cache/google-chrome')
+    for root in ('/mnt/u', '/home/u', '/'):
+        n = len(root.rstrip('/') + '/')
+        for allow_mnt, allow_media in ((False, False), (True, False), (False, True)):
+            match = fscan.skip_pattern(root, allow_mnt, allow_media).match
+            prefixes = fscan.skip_prefixes(allow_mnt, allow_media)
+            for path in paths:
+                if path.startswith(root):
+                    expected = (path + '/').startswith(prefixes) or fscan.is_rel_skipped_fast(path, n)
+                    assert bool(match(path + '/')) == expected, (root, path)
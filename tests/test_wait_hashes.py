@@ -0,0 +1,26 @@
+from concurrent.futures import Future
+
+import fscan
+
+
+def _row(name, slot):
+    row = [8, 1, 5, '/d', name, None, 33188, 0, 0, 1, 1.5, 2.5, 3.5, 0, 1, 0, None, None, None, 1, None]
+    row[fscan.HASH_ID_COL] = slot
+    return tuple(row)
+
+
+def test_shared_failed_future_reported_once():
+    # hardlinks of one inode share the Future, possibly across batches
+    fut = Future()
+    fut.set_exception(OSError('unreadable'))
+    hash_errors = [0]
+    failed = set()
+    assert fscan._wait_hashes([_row('a', fut), _row('b', fut)], hash_errors, failed) == {0: None, 1: None}
+    assert fscan._wait_hashes([_row('c', fut)], hash_errors, failed) == {0: None}
+    assert hash_errors == [1]
+
+
+def test_shared_future_digest_for_every_row():
+    fut = Future()
+    fut.set_result('abc')
+    assert fscan._wait_hashes([_row('a', fut), _row('b', 'def'), _row('c', fut)], [0]) == {0: 'abc', 1: 'def', 2: 'abc'}